@@ -0,0 +1,66 @@
+"""Encode/decode time and size of each storage codec on a synthetic levels file.
+
+    python -m benchmarks.bench_codecs [users]
+
+Compares the legacy ``json.dump(..., indent=4)`` of data/levels.json with every
+installed codec, both as one object and as a record stream.
+"""
+import io
+import json
+import random
+import sys
+import time
+
+from utils import codec
+
+GUILDS = 10
+
+def make_levels(users: int) -> dict:
+    """Build data in the legacy levels.json shape: {guild: {user: {"xp", "level"}}}."""
+    rng = random.Random(42)
+    data = {}
+    for i in range(users):
+        guild = str(1_000_000_000_000_000_000 + i % GUILDS)
+        user = str(rng.randrange(10**17, 10**19))
+        data.setdefault(guild, {})[user] = {"xp": rng.randrange(0, 500_000), "level": rng.randrange(0, 120)}
+    return data
+
+def as_records(data: dict):
+    for guild, users in data.items():
+        for user, info in users.items():
+            yield [int(guild), int(user), info["xp"], info["level"]]
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+def main(users: int):
+    data = make_levels(users)
+    records = list(as_records(data))
+    rows = []
+
+    payload, enc = timed(lambda: json.dumps(data, indent=4).encode("utf-8"))
+    _, dec = timed(json.loads, payload)
+    rows.append(("json indent=4 (legacy)", enc, dec, len(payload)))
+
+    for name in codec.available_codecs():
+        c = codec.get_codec(name)
+        payload, enc = timed(c.dumps, data)
+        _, dec = timed(c.loads, payload)
+        rows.append((f"{name} object", enc, dec, len(payload)))
+
+        buf = io.BytesIO()
+        _, enc = timed(c.write_stream, buf, records)
+        size = buf.tell()
+        buf.seek(0)
+        _, dec = timed(lambda: sum(1 for _ in c.read_stream(buf)))
+        rows.append((f"{name} stream", enc, dec, size))
+
+    print(f"{users:,} users across {GUILDS} guilds")
+    print(f"{'codec':<24}{'encode ms':>12}{'decode ms':>12}{'size KiB':>12}")
+    for name, enc, dec, size in rows:
+        print(f"{name:<24}{enc:>12.1f}{dec:>12.1f}{size / 1024:>12.0f}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
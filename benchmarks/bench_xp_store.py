@@ -0,0 +1,93 @@
+"""Memory per member and access time of the leveling data layouts.
+
+    python -m benchmarks.bench_xp_store [users]
+
+Builds the same synthetic members (default 1,000,000, one guild) as the legacy
+{str user_id: {"xp", "level"}} dicts and as a utils.xp_store.GuildLevels table,
+measures what each holds with tracemalloc, then times lookups and XP updates.
+LevelingCog builds a rank index (utils.rank_index) only for guilds whose
+rankings are being looked at (/rank, /leaderboard); the store-only row is what
+every other guild pays per member and per XP gain, the "store + RankIndex" row
+what a guild pays while its rankings are in use.
+"""
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+from utils.rank_index import RankIndex
+from utils.xp_store import GuildLevels
+
+LOOKUPS = 200_000
+
+def make_members(users: int) -> list[tuple[int, int, int]]:
+    rng = random.Random(42)
+    return [(rng.randrange(10**17, 10**19), rng.randrange(0, 500_000), rng.randrange(0, 120)) for _ in range(users)]
+
+def measured(build):
+    """(result, bytes allocated by build())"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - start) * 1000
+
+def legacy_ops(data: dict, ids: list[int]):
+    for user_id in ids:
+        entry = data[str(user_id)]
+        entry["xp"] += 10
+
+def store_ops(store: GuildLevels, ids: list[int]):
+    for user_id in ids:
+        store.add_xp(user_id, 10)
+
+def ranked_ops(store: GuildLevels, ranks: RankIndex, ids: list[int]):
+    for user_id in ids:
+        old = store.get_xp(user_id)
+        slot = store.add_xp(user_id, 10)
+        ranks.update(user_id, old, store.xp[slot], slot)
+
+def main(users: int):
+    members = make_members(users)
+    rng = random.Random(7)
+    ids = [members[rng.randrange(users)][0] for _ in range(LOOKUPS)]
+
+    legacy, legacy_bytes = measured(lambda: {str(u): {"xp": xp, "level": lvl} for u, xp, lvl in members})
+    legacy_ms = timed(legacy_ops, legacy, ids)
+    del legacy
+
+    build_ms = timed(GuildLevels, members)   # untraced; tracemalloc slows allocation down a lot
+    store, store_bytes = measured(lambda: GuildLevels(members))
+    store_ms = timed(store_ops, store, ids)
+
+    ranks, rank_bytes = measured(lambda: RankIndex(store))
+    ranked_ms = timed(ranked_ops, store, ranks, ids)
+
+    print(f"{users:,} members, {LOOKUPS:,} XP updates")
+    print(f"{'layout':<32}{'MiB':>10}{'bytes/user':>12}{'update µs':>12}")
+    for name, size, ms in (
+        ("legacy dict of dicts", legacy_bytes, legacy_ms),
+        ("GuildLevels (columnar)", store_bytes, store_ms),
+        ("GuildLevels + RankIndex", store_bytes + rank_bytes, ranked_ms),
+    ):
+        print(f"{name:<32}{size / 2**20:>10.1f}{size / users:>12.1f}{ms * 1000 / LOOKUPS:>12.2f}")
+    print(f"GuildLevels build: {build_ms:.0f} ms; getsizeof reports {sys.getsizeof(store) / 2**20:.1f} MiB")
+    print(
+        f"legacy / store only (rankings not in use): {legacy_bytes / store_bytes:.1f}x less memory, "
+        f"{store_ms / legacy_ms:.1f}x the update time"
+    )
+    print(
+        f"legacy / store + RankIndex (rankings in use): {legacy_bytes / (store_bytes + rank_bytes):.1f}x less memory, "
+        f"{ranked_ms / legacy_ms:.1f}x the update time"
+    )
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -1,21 +1,34 @@
 import os
 import logging
+import time
 from datetime import datetime, timezone
 import discord
 from discord.ext import commands, tasks
 from dotenv import load_dotenv  # pip install python-dotenv
-from utils.storage import get_guild_settings
+
+# Load .env before the utils imports and setup_logging(): they read their
+# settings (DATABASE_PATH, STORAGE_CODEC, TRACE_*, LOG_*) at import/setup time
+load_dotenv()  # loads .env file if present
+
+from utils.storage import get_guild_config, notify_changed, warm
+from utils.migrate import migrate_if_needed
+from utils.cluster import ClusterStatsClient, parse_shard_ids
+from utils.cache_profile import build_profile, memory_report
+from utils.startup import fan_out, first_time, sync_if_changed
+from utils.extensions import format_report, load_extensions
+from utils.cog_gate import CogGateMixin
+from utils.metrics import MetricsMixin
+from utils.watchdog import LoopWatchdog
 from utils.embed_utils import create_modern_embed
-import requests
+from utils.logging_setup import setup_logging
 
 
-logging.basicConfig(level=logging.INFO)
+setup_logging()
 log = logging.getLogger("CM-V5.4")
 
 # -------------------
 # Load environment variables
 # -------------------
-load_dotenv()  # loads .env file if present
 TOKEN = os.getenv("DISCORD_TOKEN")
 if not TOKEN:
     raise SystemExit("DISCORD_TOKEN not set in environment variables.")
@@ -30,11 +43,64 @@ if not GITHUB_TOKEN:
 
 PREFIX = os.getenv("BOT_PREFIX", "?")
 
+# "Bot Ready" notifications: parallel sends and sends per second
+READY_NOTIFY_CONCURRENCY = int(os.getenv("READY_NOTIFY_CONCURRENCY", "5"))
+READY_NOTIFY_RATE = float(os.getenv("READY_NOTIFY_RATE", "5"))
+
+# -------------------
+# Sharding / cluster mode
+# -------------------
+# SHARD_COUNT unset: one plain Bot. "auto": AutoShardedBot with Discord's recommended count.
+# A number: AutoShardedBot owning SHARD_IDS (e.g. "0-3"), or all shards if unset.
+# launcher.py sets these plus CLUSTER_ID / CLUSTER_IPC for every worker process.
+SHARD_COUNT = os.getenv("SHARD_COUNT")
+SHARD_IDS = os.getenv("SHARD_IDS")
+CLUSTER_ID = int(os.getenv("CLUSTER_ID", "0"))
+CLUSTER_IPC = os.getenv("CLUSTER_IPC")
+
+# Prometheus metrics / health endpoint; "off" disables it. Cluster workers add CLUSTER_ID to the port.
+METRICS_ADDR = os.getenv("METRICS_ADDR", "127.0.0.1:9120")
+
+# Event loop stall detection (staging): LOOP_WATCHDOG=1, threshold in ms
+LOOP_WATCHDOG = os.getenv("LOOP_WATCHDOG", "0") == "1"
+LOOP_WATCHDOG_MS = float(os.getenv("LOOP_WATCHDOG_MS", "250"))
+
+# -------------------
+# Cogs / gateway cache profile
+# -------------------
+# DISABLED_EXTENSIONS: comma separated cog file names (e.g. "fun,quotes") that are not loaded at all.
+# CACHE_PROFILE: auto (default), minimal or full - see utils/cache_profile.py
+DISABLED_EXTENSIONS = {name.strip() for name in os.getenv("DISABLED_EXTENSIONS", "").split(",") if name.strip()}
+EXTENSIONS = sorted(
+    file[:-3] for file in os.listdir("./cogs")
+    if file.endswith(".py") and file[:-3] not in DISABLED_EXTENSIONS
+)
+CACHE_PROFILE = build_profile(EXTENSIONS, os.getenv("CACHE_PROFILE", "auto"))
+log.info(f"Gateway cache {CACHE_PROFILE.describe()}")
+
 # -------------------
 # Bot setup
 # -------------------
-intents = discord.Intents.all()
-bot = commands.Bot(command_prefix=PREFIX, intents=intents)
+class Bot(MetricsMixin, CogGateMixin, commands.Bot):
+    """Skips listeners/commands of cogs a guild disabled and records metrics."""
+
+class ShardedBot(MetricsMixin, CogGateMixin, commands.AutoShardedBot):
+    """Sharded variant of Bot."""
+
+if SHARD_COUNT == "auto":
+    bot = ShardedBot(command_prefix=PREFIX, **CACHE_PROFILE.bot_kwargs())
+elif SHARD_COUNT:
+    bot = ShardedBot(
+        command_prefix=PREFIX,
+        shard_count=int(SHARD_COUNT),
+        shard_ids=parse_shard_ids(SHARD_IDS) if SHARD_IDS else None,
+        **CACHE_PROFILE.bot_kwargs()
+    )
+else:
+    bot = Bot(command_prefix=PREFIX, **CACHE_PROFILE.bot_kwargs())
+
+# Cross-process stats (only when started by launcher.py)
+cluster_stats = ClusterStatsClient(CLUSTER_IPC, CLUSTER_ID) if CLUSTER_IPC else None
 
 # Track bot start time (timezone-aware UTC)
 START_TIME = datetime.now(timezone.utc)
@@ -44,7 +110,12 @@ START_TIME = datetime.now(timezone.utc)
 # -------------------
 @tasks.loop(seconds=30)
 async def update_status():
-    total_members = sum(guild.member_count for guild in bot.guilds)
+    total_members = sum(guild.member_count or 0 for guild in bot.guilds)
+    if cluster_stats:
+        shards = len(bot.shards) if isinstance(bot, commands.AutoShardedBot) else 1
+        totals = await cluster_stats.exchange(len(bot.guilds), total_members, shards)
+        if totals:
+            total_members = totals["members"]
     uptime_delta = datetime.now(timezone.utc) - START_TIME
 
     days, remainder = divmod(int(uptime_delta.total_seconds()), 86400)
@@ -62,13 +133,14 @@ async def update_status():
 # Cog Loader
 # -------------------
 async def load_cogs():
-    for file in os.listdir("./cogs"):
-        if file.endswith(".py"):
-            try:
-                await bot.load_extension(f"cogs.{file[:-3]}")
-                log.info(f"✅ Loaded cog: {file}")
-            except Exception as e:
-                log.error(f"❌ Failed to load {file}: {e}")
+    start = time.perf_counter()
+    timings = await load_extensions(bot, EXTENSIONS)
+    for t in timings:
+        if t.error is None:
+            log.info(f"✅ Loaded cog: {t.name}.py")
+        else:
+            log.error(f"❌ Failed to load {t.name}.py: {t.error}")
+    log.info("Cog startup report:\n" + format_report(timings, (time.perf_counter() - start) * 1000))
 
 
 #
@@ -79,6 +151,7 @@ def github_request(url: str):
     Makes a GitHub API GET request using the token if available.
     Returns a requests.Response object.
     """
+    import requests  # only needed here; keeps it off the startup path
     headers = {
         "Accept": "application/vnd.github+json"
     }
@@ -89,41 +162,85 @@ def github_request(url: str):
 # -------------------
 # Events
 # -------------------
+async def invalidate_guild_caches(obj):
+    """Channels/roles that cogs resolved from the config go stale when one is deleted."""
+    notify_changed(getattr(obj, "guild", obj).id)
+
+bot.add_listener(invalidate_guild_caches, "on_guild_channel_delete")
+bot.add_listener(invalidate_guild_caches, "on_guild_role_delete")
+bot.add_listener(invalidate_guild_caches, "on_guild_remove")
+
+async def warm_guild_settings(guild: discord.Guild):
+    await warm([guild.id])
+
+bot.add_listener(warm_guild_settings, "on_guild_join")
+
 @bot.event
 async def setup_hook():
+    if LOOP_WATCHDOG:
+        LoopWatchdog(threshold=LOOP_WATCHDOG_MS / 1000).start()
+
+    if METRICS_ADDR != "off":
+        host, _, port = METRICS_ADDR.rpartition(":")
+        try:
+            await bot.metrics_server.start(host or "127.0.0.1", int(port) + CLUSTER_ID)
+        except OSError as e:
+            log.error(f"Metrics endpoint not started: {e}")
+
+    # Import legacy JSON files into SQLite before any cog reads its data
+    migrate_if_needed()
     await load_cogs()
 
+    # Commands are global: one cluster syncing them is enough.
+    # setup_hook runs once per process, so reconnects never get here.
+    if CLUSTER_ID == 0:
+        try:
+            synced = await sync_if_changed(bot.tree)
+            if synced is not None:
+                log.info(f"Synced {synced} slash commands.")
+        except Exception as e:
+            log.error(e)
+
+def config_channels():
+    for guild in bot.guilds:
+        config_ch_id = get_guild_config(guild.id).get("config_channel")
+        config_ch = guild.get_channel(config_ch_id) if config_ch_id else None
+        if config_ch:
+            yield config_ch
+
+async def send_ready_notification(config_ch: discord.abc.Messageable):
+    embed = create_modern_embed(
+        title="Bot Ready",
+        description=f"Guild ID: {config_ch.guild.id}\nAll settings loaded successfully.",
+        color=discord.Color.green(),
+        emoji_prefix="⚙️"
+    )
+    await config_ch.send(embed=embed)
+
 @bot.event
 async def on_ready():
+    # on_ready fires again after every reconnect; only the first one does startup work
+    if not first_time("ready"):
+        log.info(f"Reconnected as {bot.user}")
+        return
     log.info(f"Logged in as {bot.user}")
 
-    # Start rich presence
-    update_status.start()
+    # Load every guild's config in one off-loop query instead of one read per guild on first use
+    log.info(f"Preloaded settings of {await warm([guild.id for guild in bot.guilds])} guilds")
 
-    # Send startup embed to configured channel if exists
-    for guild in bot.guilds:
-        settings = get_guild_settings(guild.id)
-        config_ch_id = settings.get("config_channel")
-        config_ch = guild.get_channel(config_ch_id) if config_ch_id else None
+    # Start rich presence
+    if not update_status.is_running():
+        update_status.start()
 
-        if config_ch:
-            embed = create_modern_embed(
-                title="Bot Ready",
-                description=f"Guild ID: {guild.id}\nAll settings loaded successfully.",
-                color=discord.Color.green(),
-                emoji_prefix="⚙️"
-            )
-            await config_ch.send(embed=embed)
-
-    try:
-        synced = await bot.tree.sync()
-        log.info(f"Synced {len(synced)} slash commands.")
-    except Exception as e:
-        log.error(e)
+    # Send startup embed to configured channels, a few at a time
+    sent = await fan_out(config_channels(), send_ready_notification, READY_NOTIFY_CONCURRENCY, READY_NOTIFY_RATE)
+    log.info(f"Sent {sent} ready notifications")
 
+    log.info(f"Memory footprint {memory_report(bot, CACHE_PROFILE)}")
     log.info("Bot ready and operational!")
 
 # -------------------
 # Run Bot
 # -------------------
-bot.run(TOKEN)
+# Logging goes through utils.logging_setup; don't let discord.py add its own handler
+bot.run(TOKEN, log_handler=None)
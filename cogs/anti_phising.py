@@ -2,12 +2,18 @@ import discord
 from discord.ext import commands
 import os
 import json
+import logging
 from datetime import datetime
 from utils.embed_utils import create_modern_embed
+from utils import persistence
+from utils.codec import json_codec
+from utils.storage import DerivedCache
+
+log = logging.getLogger(f"CM-V5.4.{__name__}")
 
 BLACKLIST_DIR = "blacklisted/"
-BLOCK_LOG_FILE = "blacklisted/blocked.txt"
-GUILD_DATA_DIR = "Guild_data/"
+BLOCK_LOG_FILE = "blacklisted/blocked.jsonl"         # one JSON record per line, append-only
+LEGACY_BLOCK_LOG_FILE = "blacklisted/blocked.txt"    # old format: a single JSON array
 
 class AntiPhishing(commands.Cog):
     """Blocks blacklisted links/words and logs them to a security channel using pre-made config."""
@@ -15,17 +21,43 @@ class AntiPhishing(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
-        # Ensure directories exist
-        os.makedirs(BLACKLIST_DIR, exist_ok=True)
-        os.makedirs(GUILD_DATA_DIR, exist_ok=True)
+        # Filled by cog_load
+        self.blacklisted = []
+
+        # Block log entries waiting to be written
+        self.pending_blocks = []
+
+        # Resolved security-log channel per guild, dropped when its config changes
+        self._security_channels = DerivedCache(self._resolve_security_channel)
+
+    async def cog_load(self):
+        self.blacklisted = await persistence.run(self._prepare_blacklists)
 
-        # Ensure global block log exists
-        if not os.path.exists(BLOCK_LOG_FILE):
-            with open(BLOCK_LOG_FILE, "w", encoding="utf-8") as f:
-                json.dump([], f)
+    def cog_unload(self):
+        self._security_channels.close()
 
-        # Load all blacklisted terms
-        self.blacklisted = self.load_blacklists()
+    # State handed over on /cog-reload: block log entries not written yet
+    def export_state(self) -> dict:
+        # Take the entries so a write still queued for the old instance doesn't log them twice
+        entries, self.pending_blocks = self.pending_blocks, []
+        return {"pending_blocks": entries}
+
+    def import_state(self, state: dict):
+        pending = state.get("pending_blocks", [])
+        if pending:
+            self.pending_blocks[:0] = pending
+            persistence.schedule(BLOCK_LOG_FILE, self._write_block_log)
+
+    def memory_stats(self) -> dict:
+        return {"blacklisted": len(self.blacklisted), "pending_blocks": len(self.pending_blocks)}
+
+    def _prepare_blacklists(self):
+        """Runs on the persistence pool: create the folder, convert the old log, read every list."""
+        os.makedirs(BLACKLIST_DIR, exist_ok=True)
+
+        # Convert the old array log before it gets picked up as a blacklist
+        self._convert_legacy_block_log()
+        return self.load_blacklists()
 
     def load_blacklists(self):
         """Load all .txt files in blacklisted folder into a single list."""
@@ -36,37 +68,51 @@ class AntiPhishing(commands.Cog):
                 with open(path, "r", encoding="utf-8") as f:
                     lines = [line.strip().lower() for line in f if line.strip()]
                     blacklist.extend(lines)
-        print(f"[AntiPhishing] Loaded {len(blacklist)} blacklist entries.")
+        log.info(f"Loaded {len(blacklist)} blacklist entries.")
         return blacklist
 
-    def save_block_log(self, user_id, guild_id, content, matched):
-        """Append blocked message to blocked.txt"""
+    def _convert_legacy_block_log(self):
+        if not os.path.exists(LEGACY_BLOCK_LOG_FILE):
+            return
         try:
-            with open(BLOCK_LOG_FILE, "r", encoding="utf-8") as f:
+            with open(LEGACY_BLOCK_LOG_FILE, "r", encoding="utf-8") as f:
                 logs = json.load(f)
-        except Exception:
-            logs = []
+        except (OSError, ValueError):
+            return
+        persistence.append_records(BLOCK_LOG_FILE, logs, json_codec())
+        os.remove(LEGACY_BLOCK_LOG_FILE)
 
-        logs.append({
+    def save_block_log(self, user_id, guild_id, content, matched):
+        """Queue a blocked message for blocked.jsonl; the file is written off the event loop."""
+        self.pending_blocks.append({
             "timestamp": datetime.utcnow().isoformat(),
             "user_id": user_id,
             "guild_id": guild_id,
             "content": content,
             "matched": matched
         })
+        persistence.schedule(BLOCK_LOG_FILE, self._write_block_log)
+
+    def _write_block_log(self):
+        """Runs on the persistence pool: append every queued entry (no rewrite of old entries)."""
+        entries, self.pending_blocks = self.pending_blocks, []
+        if not entries:
+            return
+        try:
+            persistence.append_records(BLOCK_LOG_FILE, entries, json_codec())
+        except OSError:
+            # Keep the entries for the next save
+            self.pending_blocks[:0] = entries
+            raise
 
-        with open(BLOCK_LOG_FILE, "w", encoding="utf-8") as f:
-            json.dump(logs, f, indent=4)
+    @staticmethod
+    def _resolve_security_channel(guild: discord.Guild, config) -> discord.TextChannel | None:
+        sec_log_id = config["logging"].get("security-log")
+        return guild.get_channel(sec_log_id) if sec_log_id else None
 
     def _get_security_channel(self, guild: discord.Guild) -> discord.TextChannel | None:
-        """Fetch security-log channel from guild JSON config"""
-        guild_file = os.path.join(GUILD_DATA_DIR, f"{guild.id}.json")
-        if not os.path.exists(guild_file):
-            return None
-        with open(guild_file, "r", encoding="utf-8") as f:
-            guild_data = json.load(f)
-            sec_log_id = guild_data.get("logging_channels", {}).get("security-log")
-            return guild.get_channel(sec_log_id) if sec_log_id else None
+        """Fetch security-log channel from the guild's logging config"""
+        return self._security_channels.get(guild)
 
     async def _send_embed(self, ch: discord.TextChannel, content: str):
         """Send an embed to the given channel using your embed generator"""
@@ -1,17 +1,61 @@
+import asyncio
+import os
+import logging
+import time
 import discord
 from discord import app_commands
 from discord.ext import commands
 from utils.storage import get_disabled_cogs, enable_cog_for_guild, disable_cog_for_guild
 from utils.embed_utils import create_modern_embed
+from utils.command_sync import clear_guild_copies
+from utils.startup import first_time, sync_if_changed
+from utils import breaker
+
+log = logging.getLogger(f"CM-V5.4.{__name__}")
 
 BOT_OWNER_ID = 1305579806557208657  # Replace with your Discord ID
-CORE_COGS = ["CogManager", "LoggingCog", "SetupCog", "GuildJoin", "WelcomeCog"]  # Core cogs
+BREAKER_REPORT_INTERVAL = 15 * 60  # seconds between two owner DMs about the same cog and state
+CORE_COGS = ["CogManager", "DiagnosticsCog", "LoggingCog", "SetupCog", "GuildJoin", "WelcomeCog"]  # Core cogs
 
 class CogManager(commands.Cog):
     """Enable, disable, and list cogs per guild with core cogs protected."""
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self._cleanup_task: asyncio.Task | None = None
+        self._breaker_reports: dict[tuple[str, str], float] = {}   # (cog, kind) -> last DM
+
+    async def cog_load(self):
+        breaker.on_state_change(self._breaker_changed)
+
+    def cog_unload(self):
+        if self._cleanup_task is not None:
+            self._cleanup_task.cancel()
+        breaker.remove_state_listener(self._breaker_changed)
+
+    def _breaker_changed(self, cog_breaker: breaker.CogBreaker, previous: str):
+        """Tell the bot owner when a cog starts or stops being shed (at most once per interval each)."""
+        kind = "protected" if cog_breaker.protected else cog_breaker.state
+        now = time.monotonic()
+        key = (cog_breaker.cog_name, kind)
+        if now - self._breaker_reports.get(key, -BREAKER_REPORT_INTERVAL) < BREAKER_REPORT_INTERVAL:
+            log.info(f"Not reporting {cog_breaker.cog_name} ({kind}) again yet: {cog_breaker.reason}")
+            return
+        self._breaker_reports[key] = now
+
+        if cog_breaker.protected:
+            message = f"⚠️ Protected cog `{cog_breaker.cog_name}` is over its budget ({cog_breaker.reason}); it keeps running."
+        elif cog_breaker.state == breaker.OPEN:
+            message = f"🔌 Listeners of `{cog_breaker.cog_name}` are shed: {cog_breaker.reason}."
+        else:
+            message = f"✅ `{cog_breaker.cog_name}` is healthy again; its listeners run normally."
+        self.bot.loop.create_task(self._notify_owner(message))
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Commands are all global; remove guild copies that older versions uploaded
+        if first_time("guild_command_cleanup"):
+            self._cleanup_task = self.bot.loop.create_task(clear_guild_copies(self.bot))
 
     def _all_cogs(self):
         return list(self.bot.cogs.keys())
@@ -22,14 +66,14 @@ class CogManager(commands.Cog):
             try:
                 await owner.send(message)
             except discord.Forbidden:
-                print("Cannot DM the bot owner.")
+                log.warning("Cannot DM the bot owner.")
 
     async def _notify_guild_owner(self, guild_owner: discord.User, message: str):
         if guild_owner:
             try:
                 await guild_owner.send(message)
             except discord.Forbidden:
-                print(f"Cannot DM server owner {guild_owner}.")
+                log.warning(f"Cannot DM server owner {guild_owner}.")
 
     # -------------------
     # Disable a cog
@@ -69,7 +113,8 @@ class CogManager(commands.Cog):
             await ctx.send(f"ℹ️ Cog `{cog_name}` is already disabled.", ephemeral=True)
             return
 
-        disable_cog_for_guild(ctx.guild.id, cog_name)
+        # Its commands stay listed (Discord can't hide a global command per guild); the cog gate refuses them
+        await disable_cog_for_guild(ctx.guild.id, cog_name)
         embed = create_modern_embed(
             title="Cog Disabled",
             description=f"⛔ Cog `{cog_name}` has been disabled for this server.",
@@ -96,7 +141,7 @@ class CogManager(commands.Cog):
             await ctx.send(f"ℹ️ Cog `{cog_name}` is already enabled.", ephemeral=True)
             return
 
-        enable_cog_for_guild(ctx.guild.id, cog_name)
+        await enable_cog_for_guild(ctx.guild.id, cog_name)
         embed = create_modern_embed(
             title="Cog Enabled",
             description=f"✅ Cog `{cog_name}` has been enabled for this server.",
@@ -105,6 +150,91 @@ class CogManager(commands.Cog):
         )
         await ctx.send(embed=embed, ephemeral=True)
 
+    # -------------------
+    # Hot reload (bot owner only)
+    # -------------------
+    def _extension_of(self, name: str) -> str | None:
+        """Accept a cog name (LevelingCog) or an extension name (leveling / cogs.leveling)."""
+        cog = self.bot.get_cog(name)
+        if cog:
+            return cog.__module__
+        ext = name if name.startswith("cogs.") else f"cogs.{name}"
+        return ext if ext in self.bot.extensions else None
+
+    @commands.hybrid_command(name="cog-reload", description="Reload a cog without restarting the bot (owner only)")
+    @app_commands.describe(name="Cog or extension name, e.g. LevelingCog or leveling")
+    async def reload_cog_command(self, ctx: commands.Context, *, name: str):
+        if ctx.author.id != BOT_OWNER_ID:
+            await ctx.send("⛔ Only the bot owner can reload cogs.", ephemeral=True)
+            return
+
+        ext = self._extension_of(name)
+        if ext is None:
+            await ctx.send(f"❌ Unknown cog or extension: `{name}`", ephemeral=True)
+            return
+
+        # Cogs with export_state()/import_state() hand their in-memory data to the new instance
+        states = {
+            cog.qualified_name: cog.export_state()
+            for cog in self.bot.cogs.values()
+            if cog.__module__ == ext and hasattr(cog, "export_state")
+        }
+        error = None
+        try:
+            await self.bot.reload_extension(ext)
+        except commands.ExtensionError as e:
+            # discord.py puts the previous version back; it still gets the state below
+            error = e
+        for cog_name, state in states.items():
+            cog = self.bot.get_cog(cog_name)
+            if cog is not None and hasattr(cog, "import_state"):
+                cog.import_state(state)
+
+        # Commands may have changed; the sync is skipped when nothing did
+        if error is None and os.getenv("CLUSTER_ID", "0") == "0":
+            try:
+                await sync_if_changed(self.bot.tree)
+            except discord.HTTPException as e:
+                error = e
+
+        if error is None:
+            embed = create_modern_embed(
+                title="Cog Reloaded",
+                description=f"🔄 `{ext}` reloaded; carried over state of {len(states)} cog(s).",
+                color=discord.Color.green(),
+                emoji_prefix="⚙️"
+            )
+        else:
+            embed = create_modern_embed(
+                title="Reload Failed",
+                description=f"❌ `{ext}`: {error}",
+                color=discord.Color.red(),
+                emoji_prefix="⚙️"
+            )
+        await ctx.send(embed=embed, ephemeral=True)
+
+    # -------------------
+    # Cog health (bot owner only)
+    # -------------------
+    @commands.hybrid_command(name="cog-health", description="Latency/error budget state of every cog (owner only)")
+    async def health_command(self, ctx: commands.Context):
+        if ctx.author.id != BOT_OWNER_ID:
+            await ctx.send("⛔ Only the bot owner can view cog health.", ephemeral=True)
+            return
+
+        icons = {breaker.CLOSED: "✅", breaker.HALF_OPEN: "🟡", breaker.OPEN: "🔌"}
+        lines = [
+            f"{icons[b.state]} `{b.cog_name}`{' 🛡️' if b.protected else ''}: {b.describe()}"
+            for b in sorted(breaker.all_breakers(), key=lambda b: b.cog_name)
+        ]
+        embed = create_modern_embed(
+            title="Cog Health",
+            description="\n".join(lines) if lines else "No listener calls recorded yet.",
+            color=discord.Color.blurple(),
+            emoji_prefix="🩺"
+        )
+        await ctx.send(embed=embed, ephemeral=True)
+
     # -------------------
     # List all cogs
     # -------------------
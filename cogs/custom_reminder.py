@@ -1,7 +1,7 @@
 import discord
 from discord import app_commands
 from discord.ext import commands, tasks
-from utils.storage import get_guild_settings, set_guild_settings
+from utils import database, persistence
 from datetime import datetime, timezone
 
 class SimpleReminder(commands.Cog):
@@ -9,8 +9,13 @@ class SimpleReminder(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+
+    async def cog_load(self):
         self.daily_reminder_loop.start()
 
+    def cog_unload(self):
+        self.daily_reminder_loop.cancel()
+
     @app_commands.command(
         name="set_reminder",
         description="Set a daily reminder with a title and message"
@@ -32,18 +37,9 @@ class SimpleReminder(commands.Cog):
         if not (0 <= hour < 24) or not (0 <= minute < 60):
             return await interaction.response.send_message("❌ Invalid time.", ephemeral=True)
 
-        settings = get_guild_settings(interaction.guild.id)
-        reminders = settings.get("daily_reminders", [])
-        reminders.append({
-            "channel_id": interaction.channel.id,
-            "hour": hour,
-            "minute": minute,
-            "title": title,
-            "message": message,
-            "last_sent": None
-        })
-        settings["daily_reminders"] = reminders
-        set_guild_settings(interaction.guild.id, settings)
+        await persistence.run(
+            database.add_reminder, interaction.guild.id, interaction.channel.id, hour, minute, title, message
+        )
 
         await interaction.response.send_message(
             f"✅ Daily reminder set for **{hour:02d}:{minute:02d} UTC** in {interaction.channel.mention}.",
@@ -55,23 +51,20 @@ class SimpleReminder(commands.Cog):
         now = datetime.now(timezone.utc)
         today_str = now.date().isoformat()
 
-        for guild in self.bot.guilds:
-            settings = get_guild_settings(guild.id)
-            reminders = settings.get("daily_reminders", [])
-
-            for reminder in reminders:
-                if reminder.get("last_sent") == today_str:
+        # Only reminders scheduled for this minute are read (indexed on hour, minute)
+        for reminder in await persistence.run(database.load_due_reminders, now.hour, now.minute):
+            if reminder["last_sent"] == today_str:
+                continue
+            guild = self.bot.get_guild(reminder["guild_id"])
+            channel = guild.get_channel(reminder["channel_id"]) if guild else None
+            if channel:
+                try:
+                    await channel.send(f"**{reminder['title']}**\n{reminder['message']}")
+                    persistence.schedule(
+                        f"reminder:{reminder['id']}", database.mark_reminder_sent, reminder["id"], today_str
+                    )
+                except discord.Forbidden:
                     continue
-                if reminder["hour"] == now.hour and reminder["minute"] == now.minute:
-                    channel = guild.get_channel(reminder["channel_id"])
-                    if channel:
-                        try:
-                            await channel.send(f"**{reminder['title']}**\n{reminder['message']}")
-                            reminder["last_sent"] = today_str
-                            settings["daily_reminders"] = reminders
-                            set_guild_settings(guild.id, settings)
-                        except discord.Forbidden:
-                            continue
 
     @daily_reminder_loop.before_loop
     async def before_loop(self):
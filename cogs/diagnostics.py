@@ -0,0 +1,115 @@
+import asyncio
+import io
+import tracemalloc
+import discord
+from discord import app_commands
+from discord.ext import commands
+from utils import profiling
+from utils.embed_utils import create_modern_embed
+from cogs.cog_manager import BOT_OWNER_ID
+
+MAX_PROFILE_SECONDS = 120
+TRACEMALLOC_FRAMES = 25
+
+class DiagnosticsCog(commands.Cog):
+    """Owner-only CPU profiles and memory snapshots of the running bot."""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._profiling = False
+        self._last_snapshot: tracemalloc.Snapshot | None = None
+        self._last_sizes: dict[str, int] = {}
+
+    def cog_unload(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    async def _deny(self, ctx: commands.Context) -> bool:
+        if ctx.author.id != BOT_OWNER_ID:
+            await ctx.send("⛔ Only the bot owner can use diagnostics.", ephemeral=True)
+            return True
+        return False
+
+    @staticmethod
+    def _file(text: str, name: str) -> discord.File:
+        return discord.File(io.BytesIO(text.encode("utf-8")), filename=f"{name}-{profiling.timestamp()}.txt")
+
+    # -------------------
+    # CPU profile
+    # -------------------
+    @commands.hybrid_command(name="profile-cpu", description="Profile the bot for N seconds (owner only)")
+    @app_commands.describe(seconds="How long to profile", mode="sample: low overhead, cprofile: exact call counts")
+    @app_commands.choices(mode=[
+        app_commands.Choice(name="sample", value="sample"),
+        app_commands.Choice(name="cprofile", value="cprofile"),
+    ])
+    async def profile_cpu(self, ctx: commands.Context, seconds: int = 10, mode: str = "sample"):
+        if await self._deny(ctx):
+            return
+        if self._profiling:
+            await ctx.send("ℹ️ A profile is already running.", ephemeral=True)
+            return
+        seconds = max(1, min(seconds, MAX_PROFILE_SECONDS))
+        await ctx.defer(ephemeral=True)
+
+        self._profiling = True
+        try:
+            if mode == "cprofile":
+                report = await profiling.cprofile_for(seconds)
+            else:
+                report = await profiling.sample_for(seconds)
+        finally:
+            self._profiling = False
+
+        embed = create_modern_embed(
+            title="CPU Profile",
+            description=f"⏱️ {mode} profile over {seconds}s — top functions attached.",
+            color=discord.Color.blurple(),
+            emoji_prefix="📈"
+        )
+        await ctx.send(embed=embed, file=self._file(report, f"profile-{mode}"), ephemeral=True)
+
+    # -------------------
+    # Memory snapshots
+    # -------------------
+    @commands.hybrid_command(name="mem-snapshot", description="Memory use per cog and structure, diffed with the last snapshot (owner only)")
+    async def mem_snapshot(self, ctx: commands.Context):
+        if await self._deny(ctx):
+            return
+        await ctx.defer(ephemeral=True)
+
+        # Cog structures are read on the loop (they're mutated there); sampling keeps this short
+        sizes = profiling.structure_sizes(self.bot.cogs.values())
+        report = "In-memory structures\n" + profiling.format_sizes(sizes, self._last_sizes)
+        self._last_sizes = dict(sizes)
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+            note = "Started allocation tracing; run again later to see growth per cog."
+        else:
+            snapshot = await asyncio.to_thread(tracemalloc.take_snapshot)
+            allocations = await asyncio.to_thread(profiling.snapshot_report, snapshot, self._last_snapshot)
+            report += "\n\nTraced allocations by owner\n" + allocations
+            note = "Diffed against the previous snapshot." if self._last_snapshot else "First traced snapshot taken."
+            self._last_snapshot = snapshot
+
+        embed = create_modern_embed(
+            title="Memory Snapshot",
+            description=f"🧠 {note}\nUse `/mem-trace-stop` to stop tracing.",
+            color=discord.Color.blurple(),
+            emoji_prefix="📊"
+        )
+        await ctx.send(embed=embed, file=self._file(report, "memory"), ephemeral=True)
+
+    @commands.hybrid_command(name="mem-trace-stop", description="Stop allocation tracing (owner only)")
+    async def mem_trace_stop(self, ctx: commands.Context):
+        if await self._deny(ctx):
+            return
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._last_snapshot = None
+        await ctx.send("✅ Allocation tracing stopped.", ephemeral=True)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(DiagnosticsCog(bot))
@@ -1,7 +1,6 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import requests
 from utils.embed_utils import create_modern_embed
 import re
 import os
@@ -17,6 +16,7 @@ class GitHub(commands.Cog):
     # -----------------------
     def github_request(self, url: str):
         """Perform a GET request to GitHub API with token if available."""
+        import requests   # only needed once someone runs a GitHub command
         headers = {"Accept": "application/vnd.github+json"}
         if GITHUB_TOKEN:
             headers["Authorization"] = f"Bearer {GITHUB_TOKEN}"
@@ -33,6 +33,7 @@ class GitHub(commands.Cog):
     @app_commands.command(name="repo", description="Get information about a GitHub repository.")
     async def repo(self, interaction: discord.Interaction, github_link: str):
         await interaction.response.defer()
+        import requests
         extracted = self.extract_repo(github_link)
         if not extracted:
             return await interaction.followup.send("❌ Invalid GitHub URL. Example: https://github.com/owner/repo")
@@ -105,6 +106,7 @@ class GitHub(commands.Cog):
     @app_commands.command(name="search_repo", description="Search GitHub repositories by keyword.")
     async def search_repo(self, interaction: discord.Interaction, query: str):
         await interaction.response.defer()
+        import requests
         url = f"https://api.github.com/search/repositories?q={query}&sort=stars&order=desc&per_page=5"
         try:
             resp = self.github_request(url)
@@ -133,6 +135,7 @@ class GitHub(commands.Cog):
     @app_commands.command(name="github_user", description="Get GitHub user info.")
     async def github_user(self, interaction: discord.Interaction, username: str):
         await interaction.response.defer()
+        import requests
         url = f"https://api.github.com/users/{username}"
         try:
             resp = self.github_request(url)
@@ -186,6 +189,7 @@ class GitHub(commands.Cog):
     @app_commands.command(name="user_commits", description="Show recent commits of a user or a specific repo.")
     async def user_commits(self, interaction: discord.Interaction, username: str, repo: str = None):
         await interaction.response.defer()
+        import requests
         try:
             if repo:
                 # Specific repo
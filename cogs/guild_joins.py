@@ -1,6 +1,6 @@
 import discord
 from discord.ext import commands
-from utils.storage import get_guild_settings
+from utils.storage import get_guild_config
 from utils.embed_utils import create_modern_embed
 
 # Replace with your support/main guild ID and channel ID
@@ -47,8 +47,7 @@ class GuildJoinLogCog(commands.Cog):
         )
 
         # Send to the join-log channel configured in the guild itself (if any)
-        settings = get_guild_settings(guild.id) or {}
-        log_ch_id = settings.get("logging_channels", {}).get("join-log")
+        log_ch_id = get_guild_config(guild.id)["logging"].get("join-log")
         if log_ch_id:
             log_channel = guild.get_channel(log_ch_id)
             if log_channel:
@@ -1,41 +1,224 @@
+import asyncio
+import logging
+import os
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
-import json
-import os
 import random
+import re
+import time
+from array import array
 from utils.embed_utils import create_modern_embed
+from utils import database, persistence
+from utils.level_curve import MIN_BASE, MIN_EXPONENT, curve_for_config, progress_bar
+from utils.leaderboard_cache import LeaderboardCache
+from utils.rank_index import RankIndex
+from utils.xp_store import GuildLevels, load_guilds
+from utils.cog_gate import is_cog_disabled
+from utils.storage import DerivedCache, update_section
+
+log = logging.getLogger(f"CM-V5.4.{__name__}")
+
+# XP gains are buffered in memory and written in batches: every LEVEL_FLUSH_SECONDS,
+# or sooner once LEVEL_FLUSH_DIRTY members have changed. A hard kill loses at most
+# one interval of XP; unload and normal shutdown write everything.
+FLUSH_SECONDS = float(os.getenv("LEVEL_FLUSH_SECONDS", "30"))
+FLUSH_DIRTY = int(os.getenv("LEVEL_FLUSH_DIRTY", "1000"))
+
+# A guild's rank index is built the first time someone looks at rankings and dropped
+# after RANK_IDLE seconds without a /rank, /leaderboard or page turn; guilds nobody
+# browses pay only for the XP table.
+RANK_IDLE = 15 * 60
 
-LEVEL_FILE = "data/levels.json"
+def load_data() -> dict[int, GuildLevels]:
+    """Stream the levels table into one compact store per guild."""
+    return load_guilds(database.iter_levels())
 
-# Ensure data folder exists
-os.makedirs("data", exist_ok=True)
-if not os.path.exists(LEVEL_FILE):
-    with open(LEVEL_FILE, "w") as f:
-        json.dump({}, f, indent=4)
+PAGE_FOOTER = re.compile(r"Page (\d+)/")
+
+# -----------------------------
+# Persistent leaderboard paging
+# -----------------------------
+class LeaderboardView(discord.ui.View):
+    """One view serves every leaderboard message; the current page is read from the footer."""
+
+    def __init__(self, cog: "LevelingCog"):
+        super().__init__(timeout=None)
+        self.cog = cog
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # Component interactions bypass the command tree's per-guild gate
+        if interaction.guild_id and is_cog_disabled(interaction.guild_id, self.cog.qualified_name):
+            await interaction.response.send_message(
+                f"⛔ `{self.cog.qualified_name}` is disabled on this server.", ephemeral=True
+            )
+            return False
+        return True
 
-def load_data():
-    with open(LEVEL_FILE, "r") as f:
-        return json.load(f)
+    async def _turn(self, interaction: discord.Interaction, step: int):
+        embeds = interaction.message.embeds if interaction.message else []
+        match = PAGE_FOOTER.search(embeds[0].footer.text or "") if embeds and embeds[0].footer else None
+        page = int(match.group(1)) + step if match else 1
+        await self.cog._defer_for_index(interaction)
+        embed = await self.cog.leaderboard_embed(interaction.guild, page)
+        if interaction.response.is_done():
+            await interaction.edit_original_response(embed=embed, view=self)
+        else:
+            await interaction.response.edit_message(embed=embed, view=self)
 
-def save_data(data):
-    with open(LEVEL_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.secondary, custom_id="leaderboard:prev")
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, -1)
 
-def xp_to_level(xp):
-    """Calculate level from XP (curve: 100 * level^1.5)"""
-    level = 0
-    while xp >= int(100 * (level + 1) ** 1.5):
-        xp -= int(100 * (level + 1) ** 1.5)
-        level += 1
-    return level
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.secondary, custom_id="leaderboard:next")
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._turn(interaction, 1)
 
 class LevelingCog(commands.Cog):
     """Leveling system with XP, progress bar, level-up messages, and leaderboard."""
 
     def __init__(self, bot):
         self.bot = bot
-        self.level_data = load_data()
+        self.levels: dict[int, GuildLevels] = {}   # guild_id -> XP table
+        self.ranks: dict[int, RankIndex] = {}      # guild_id -> members ordered by XP (see rank_index)
+        self._rank_used: dict[int, float] = {}     # guild_id -> last time rankings were read
+        self._rank_builds: dict[int, asyncio.Future] = {}
+        self._level_channels = DerivedCache(self._resolve_level_channel)
+        self._curves = DerivedCache(lambda guild, config: curve_for_config(config))
+        self._leaderboards = LeaderboardCache()
+        self._leaderboard_view = LeaderboardView(self)
+        self._dirty: set[tuple[int, int]] = set()   # (guild_id, user_id) changed since the last flush
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+
+    async def cog_load(self):
+        self.levels = await persistence.run(load_data)
+        self.flush_loop.change_interval(seconds=FLUSH_SECONDS)
+        self.flush_loop.start()
+        persistence.on_flush(self._flush_at_exit)
+        self.bot.add_view(self._leaderboard_view)  # persistent view
+
+    async def cog_unload(self):
+        self.flush_loop.cancel()
+        self._level_channels.close()
+        self._curves.close()
+        self._leaderboard_view.stop()
+        persistence.remove_flush_hook(self._flush_at_exit)
+        await self.flush()
+
+    # -------------------
+    # Write-behind buffer
+    # -------------------
+    def _mark_dirty(self, guild_id: int, user_id: int):
+        self._dirty.add((guild_id, user_id))
+        if len(self._dirty) >= FLUSH_DIRTY and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    def _take_dirty(self) -> list[tuple[int, int, int, int]]:
+        """Current rows of every dirty member; the dirty set starts over."""
+        dirty, self._dirty = self._dirty, set()
+        rows = []
+        for guild_id, user_id in dirty:
+            values = self.levels[guild_id].get(user_id) if guild_id in self.levels else None
+            if values is not None:
+                rows.append((guild_id, user_id, *values))
+        return rows
+
+    async def flush(self):
+        """Upsert every member changed since the last flush in one transaction."""
+        async with self._flush_lock:
+            rows = self._take_dirty()
+            if not rows:
+                return
+            try:
+                await persistence.run(database.save_levels, rows)
+            except Exception as e:
+                # Keep them dirty; the next flush retries with their newest values
+                log.error(f"Saving {len(rows)} level rows failed: {e}")
+                self._dirty.update((g, u) for g, u, _, _ in rows)
+
+    def _flush_at_exit(self):
+        """Runs at interpreter exit when the cog was never unloaded (loop already gone)."""
+        rows = self._take_dirty()
+        if rows:
+            database.save_levels(rows)
+
+    @tasks.loop(seconds=30)
+    async def flush_loop(self):
+        await self.flush()
+        self._drop_idle_ranks()
+
+    # -------------------
+    # Rank indexes (on demand)
+    # -------------------
+    async def rank_index(self, guild_id: int) -> RankIndex | None:
+        """The guild's rank index, built off the event loop on first use; None without XP data."""
+        self._rank_used[guild_id] = time.monotonic()
+        index = self.ranks.get(guild_id)
+        if index is not None:
+            return index
+        store = self.levels.get(guild_id)
+        if not store:
+            return None
+        build = self._rank_builds.get(guild_id)
+        if build is None:
+            build = self._rank_builds[guild_id] = asyncio.ensure_future(self._build_rank_index(guild_id, store))
+        return await asyncio.shield(build)
+
+    async def _build_rank_index(self, guild_id: int, store: GuildLevels) -> RankIndex:
+        try:
+            # Sort a copy of the XP column on a worker thread; XP earned meanwhile is replayed by catch_up()
+            index = await asyncio.to_thread(RankIndex, store, array("Q", store.xp))
+        finally:
+            del self._rank_builds[guild_id]
+        index.catch_up()
+        if self.levels.get(guild_id) is store:
+            self.ranks[guild_id] = index
+        return index
+
+    async def _defer_for_index(self, interaction: discord.Interaction):
+        """Acknowledge the interaction first when the guild's index still has to be built (big guilds take a while)."""
+        if interaction.guild_id not in self.ranks and self.levels.get(interaction.guild_id):
+            await interaction.response.defer()
+
+    @staticmethod
+    async def _reply(interaction: discord.Interaction, **kwargs):
+        if interaction.response.is_done():
+            await interaction.followup.send(**kwargs)
+        else:
+            await interaction.response.send_message(**kwargs)
+
+    def _drop_idle_ranks(self):
+        cutoff = time.monotonic() - RANK_IDLE
+        for guild_id in [g for g, used in self._rank_used.items() if used < cutoff]:
+            del self._rank_used[guild_id]
+            if self.ranks.pop(guild_id, None) is not None:
+                # Pages are only invalidated through the index, so they go with it
+                self._leaderboards.invalidate(guild_id)
+
+    # State handed over on /cog-reload (the new instance already read the database,
+    # but the in-memory data is at least as fresh)
+    def export_state(self) -> dict:
+        return {"levels": self.levels}
+
+    def import_state(self, state: dict):
+        if "levels" in state:
+            self.levels = state["levels"]
+            self.ranks = {}
+
+    def memory_stats(self) -> dict:
+        return {
+            "level_guilds": len(self.levels),
+            "level_users": sum(len(store) for store in self.levels.values()),
+            "level_dirty": len(self._dirty),
+            "rank_indexes": len(self.ranks),
+            "leaderboard_pages": len(self._leaderboards),
+        }
+
+    @staticmethod
+    def _resolve_level_channel(guild: discord.Guild, config):
+        level_ch_id = config["leveling"]["channel"]
+        return guild.get_channel(level_ch_id) if level_ch_id else None
 
     # -------------------
     # Message listener for XP
@@ -45,43 +228,41 @@ class LevelingCog(commands.Cog):
         if message.author.bot or not message.guild:
             return
 
-        guild_id = str(message.guild.id)
-        user_id = str(message.author.id)
+        guild_id = message.guild.id
+        user_id = message.author.id
 
-        if guild_id not in self.level_data:
-            self.level_data[guild_id] = {}
-        if user_id not in self.level_data[guild_id]:
-            self.level_data[guild_id][user_id] = {"xp": 0, "level": 0}
+        store = self.levels.get(guild_id)
+        if store is None:
+            store = self.levels[guild_id] = GuildLevels()
+        old_xp = store.get_xp(user_id)
 
         # Random XP per message: 5-15 XP
         gain = random.randint(5, 15)
-        self.level_data[guild_id][user_id]["xp"] += gain
+        slot = store.add_xp(user_id, gain)
+        user_xp = store.xp[slot]
+        self._mark_dirty(guild_id, user_id)
+        index = self.ranks.get(guild_id)
+        if index is not None:
+            moved = index.update(user_id, old_xp, user_xp, slot)
+            if moved:
+                self._leaderboards.invalidate(guild_id, *moved)
 
         # Check level-up
-        user_xp = self.level_data[guild_id][user_id]["xp"]
-        current_level = self.level_data[guild_id][user_id]["level"]
-        new_level = xp_to_level(user_xp)
+        current_level = store.levels[slot]
+        new_level, xp_for_current_level, next_level_xp = self._curves.get(message.guild).progress(user_xp)
 
         if new_level > current_level:
-            self.level_data[guild_id][user_id]["level"] = new_level
+            store.levels[slot] = new_level
 
             # Determine level-up channel
-            level_ch_id = self.level_data[guild_id].get("level_channel")
-            level_channel = message.guild.get_channel(level_ch_id) if level_ch_id else message.channel
-
-            # Progress bar (full)
-            next_level_xp = int(100 * (new_level + 1) ** 1.5)
-            xp_for_current_level = user_xp - sum(int(100 * (i + 1) ** 1.5) for i in range(new_level))
-            bar_length = 20
-            filled_length = int(bar_length * xp_for_current_level / next_level_xp)
-            progress_bar = "🟩" * filled_length + "⬛" * (bar_length - filled_length)
+            level_channel = self._level_channels.get(message.guild) or message.channel
 
             embed = create_modern_embed(
                 title=f"{message.author.display_name} leveled up!",
                 description=(
                     f"🎉 {message.author.mention} reached **Level {new_level}**!\n"
                     f"XP: **{xp_for_current_level}/{next_level_xp}**\n"
-                    f"`{progress_bar}`"
+                    f"`{progress_bar(xp_for_current_level, next_level_xp)}`"
                 ),
                 color=discord.Color.green(),
                 emoji_prefix="🟢"
@@ -89,17 +270,15 @@ class LevelingCog(commands.Cog):
             embed.set_thumbnail(url=message.author.display_avatar.url)
             await level_channel.send(embed=embed)
 
-        save_data(self.level_data)
-
     # -------------------
     # /level command
     # -------------------
     @app_commands.command(name="level", description="Check your current level and XP")
     async def level(self, interaction: discord.Interaction):
-        guild_id = str(interaction.guild.id)
-        user_id = str(interaction.user.id)
+        store = self.levels.get(interaction.guild.id)
+        xp = store.get_xp(interaction.user.id) if store else None
 
-        if guild_id not in self.level_data or user_id not in self.level_data[guild_id]:
+        if xp is None:
             embed = create_modern_embed(
                 title="No XP Yet",
                 description=f"{interaction.user.mention}, you haven't earned any XP yet. Start chatting to gain XP!",
@@ -109,24 +288,14 @@ class LevelingCog(commands.Cog):
             await interaction.response.send_message(embed=embed)
             return
 
-        data = self.level_data[guild_id][user_id]
-        level = data["level"]
-        xp = data["xp"]
-
-        next_level_xp = int(100 * (level + 1) ** 1.5)
-        xp_for_current_level = xp - sum(int(100 * (i + 1) ** 1.5) for i in range(level))
-
-        # Progress bar
-        bar_length = 20
-        filled_length = int(bar_length * xp_for_current_level / next_level_xp)
-        progress_bar = "🟩" * filled_length + "⬛" * (bar_length - filled_length)
+        level, xp_for_current_level, next_level_xp = self._curves.get(interaction.guild).progress(xp)
 
         embed = create_modern_embed(
             title=f"{interaction.user.display_name}'s Level",
             description=(
                 f"Level **{level}**\n"
                 f"XP: **{xp_for_current_level}/{next_level_xp}**\n"
-                f"`{progress_bar}`"
+                f"`{progress_bar(xp_for_current_level, next_level_xp)}`"
             ),
             color=discord.Color.blurple(),
             emoji_prefix="🧾"
@@ -141,12 +310,7 @@ class LevelingCog(commands.Cog):
     @app_commands.describe(channel="The text channel where level-up messages will be sent")
     @app_commands.checks.has_permissions(administrator=True)
     async def level_channel(self, interaction: discord.Interaction, channel: discord.TextChannel):
-        guild_id = str(interaction.guild.id)
-        if guild_id not in self.level_data:
-            self.level_data[guild_id] = {}
-
-        self.level_data[guild_id]["level_channel"] = channel.id
-        save_data(self.level_data)
+        await update_section(interaction.guild.id, "leveling", channel=channel.id)
 
         embed = create_modern_embed(
             title="Level Channel Set",
@@ -156,41 +320,126 @@ class LevelingCog(commands.Cog):
         )
         await interaction.response.send_message(embed=embed)
 
+    # -------------------
+    # /level_curve command
+    # -------------------
+    @app_commands.command(name="level_curve", description="Set how much XP each level costs in this server")
+    @app_commands.describe(
+        base="XP cost of level 1 (10-100000, default 100)",
+        exponent="How fast costs grow: level N costs base × N^exponent (1.0-4.0, default 1.5)"
+    )
+    @app_commands.checks.has_permissions(administrator=True)
+    async def level_curve(
+        self, interaction: discord.Interaction,
+        base: app_commands.Range[int, MIN_BASE, 100_000] = 100,
+        exponent: app_commands.Range[float, MIN_EXPONENT, 4.0] = 1.5
+    ):
+        await update_section(interaction.guild.id, "leveling", curve_base=base, curve_exponent=exponent)
+
+        # Re-level every member on the new curve in one pass
+        guild_id = interaction.guild.id
+        store = self.levels.get(guild_id) or GuildLevels()
+        curve = self._curves.get(interaction.guild)
+        for slot, level in enumerate(curve.levels_for(store.xp)):
+            if store.levels[slot] != level:
+                store.levels[slot] = level
+                self._mark_dirty(guild_id, store.user_ids[slot])
+        self._leaderboards.invalidate(guild_id)
+
+        embed = create_modern_embed(
+            title="Level Curve Set",
+            description=(
+                f"✅ Level N now costs **{base} × N^{exponent:g}** XP.\n"
+                f"Level 10 needs **{curve.threshold(10):,}** XP in total; {len(store)} member(s) re-leveled."
+            ),
+            color=discord.Color.green(),
+            emoji_prefix="🟢"
+        )
+        await interaction.response.send_message(embed=embed)
+
     # -------------------
     # /leaderboard command
     # -------------------
     @app_commands.command(name="leaderboard", description="Show top users by XP in this server")
-    async def leaderboard(self, interaction: discord.Interaction):
-        guild_id = str(interaction.guild.id)
-        if guild_id not in self.level_data:
+    @app_commands.describe(page="Leaderboard page (10 members each)")
+    async def leaderboard(self, interaction: discord.Interaction, page: app_commands.Range[int, 1] = 1):
+        await self._defer_for_index(interaction)
+        index = await self.rank_index(interaction.guild.id)
+        if not index:
             embed = create_modern_embed(
                 title="Leaderboard",
                 description="No leveling data for this server.",
                 color=discord.Color.red(),
                 emoji_prefix="⚠️"
             )
-            await interaction.response.send_message(embed=embed)
+            await self._reply(interaction, embed=embed)
             return
 
-        sorted_users = sorted(
-            {k: v for k, v in self.level_data[guild_id].items() if isinstance(v, dict) and "xp" in v}.items(),
-            key=lambda x: x[1]["xp"],
-            reverse=True
-        )[:10]
-
-        description = ""
-        for i, (user_id, info) in enumerate(sorted_users, start=1):
-            member = interaction.guild.get_member(int(user_id))
-            name = member.display_name if member else f"User ID {user_id}"
-            description += f"**{i}. {name}** — Level {info['level']} | XP: {info['xp']}\n"
+        embed = await self.leaderboard_embed(interaction.guild, min(page, index.page_count()))
+        await self._reply(interaction, embed=embed, view=self._leaderboard_view)
 
+    async def leaderboard_embed(self, guild: discord.Guild, page: int) -> discord.Embed:
+        """Embed of one leaderboard page (wrapping around at both ends), from the page cache when fresh."""
+        index = await self.rank_index(guild.id)
+        pages = index.page_count() if index else 1
+        page = (page - 1) % pages + 1
+        description = self._leaderboards.get(guild.id, page)
+        if description is None:
+            entries = index.page(page) if index else []
+            description = self._format_entries(guild, entries) or "No leveling data for this server."
+            if index:
+                self._leaderboards.put(guild.id, page, description)
         embed = create_modern_embed(
-            title=f"🏆 {interaction.guild.name} Leaderboard",
+            title=f"🏆 {guild.name} Leaderboard",
             description=description,
             color=discord.Color.blurple(),
             emoji_prefix="🥇"
         )
-        await interaction.response.send_message(embed=embed)
+        embed.set_footer(text=f"Page {page}/{pages} • {len(index) if index else 0} ranked members")
+        return embed
+
+    def _format_entries(self, guild: discord.Guild, entries: list[tuple[int, int, int]], highlight: int | None = None) -> str:
+        """One line per (rank, user_id, xp) entry, levels converted in one batch."""
+        levels = self._curves.get(guild).levels_for(xp for _, _, xp in entries)
+        lines = []
+        for (rank, user_id, xp), level in zip(entries, levels):
+            member = guild.get_member(user_id)
+            name = member.display_name if member else f"User ID {user_id}"
+            line = f"**{rank}. {name}** — Level {level} | XP: {xp}"
+            lines.append(f"➡️ {line}" if user_id == highlight else line)
+        return "\n".join(lines)
+
+    # -------------------
+    # /rank command
+    # -------------------
+    @app_commands.command(name="rank", description="Show a member's leaderboard position and the members around them")
+    @app_commands.describe(member="Member to look up (defaults to you)")
+    async def rank(self, interaction: discord.Interaction, member: discord.Member | None = None):
+        member = member or interaction.user
+        await self._defer_for_index(interaction)
+        index = await self.rank_index(interaction.guild.id)
+        position = index.rank(member.id) if index else None
+        if position is None:
+            embed = create_modern_embed(
+                title="Not Ranked",
+                description=f"{member.mention} hasn't earned any XP yet.",
+                color=discord.Color.red(),
+                emoji_prefix="⚠️"
+            )
+            await self._reply(interaction, embed=embed)
+            return
+
+        embed = create_modern_embed(
+            title=f"{member.display_name}'s Rank",
+            description=(
+                f"Rank **#{position}** of {len(index)}\n\n"
+                + self._format_entries(interaction.guild, index.around(member.id), highlight=member.id)
+            ),
+            color=discord.Color.blurple(),
+            emoji_prefix="🏅"
+        )
+        embed.set_thumbnail(url=member.display_avatar.url)
+        await self._reply(interaction, embed=embed)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(LevelingCog(bot))
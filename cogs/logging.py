@@ -1,6 +1,6 @@
 import discord
 from discord.ext import commands
-from utils.storage import get_guild_settings
+from utils.storage import DerivedCache
 from utils.embed_utils import create_modern_embed
 
 class LoggingCog(commands.Cog):
@@ -8,12 +8,19 @@ class LoggingCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self._channels = DerivedCache(self._resolve_channels)
+
+    def cog_unload(self):
+        self._channels.close()
+
+    @staticmethod
+    def _resolve_channels(guild: discord.Guild, config) -> dict:
+        """Resolve every configured log channel once per config change."""
+        return {key: guild.get_channel(ch_id) for key, ch_id in config["logging"].items() if ch_id}
 
     def _get_channel(self, guild: discord.Guild, key: str) -> discord.TextChannel | None:
         """Retrieve the pre-configured logging channel."""
-        settings = get_guild_settings(guild.id) or {}
-        ch_id = settings.get("logging_channels", {}).get(key)
-        return guild.get_channel(ch_id) if ch_id else None
+        return self._channels.get(guild).get(key)
 
     async def _send_embed(self, ch: discord.TextChannel, title: str, description: str, color: discord.Color, emoji: str = "ℹ️"):
         if ch:
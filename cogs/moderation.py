@@ -1,7 +1,7 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from utils.storage import get_guild_settings
+from utils.storage import get_guild_config
 from utils.embed_utils import create_modern_embed
 
 class ModerationCog(commands.Cog):
@@ -9,8 +9,7 @@ class ModerationCog(commands.Cog):
         self.bot = bot
 
     def _log(self, guild, key):
-        data = get_guild_settings(guild.id)
-        ch_id = data.get("logging_channels", {}).get(key)
+        ch_id = get_guild_config(guild.id)["logging"].get(key)
         return guild.get_channel(ch_id) if ch_id else None
 
     async def _send_mod_embed(self, guild, title, description, color, emoji="⚠️"):
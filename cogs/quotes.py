@@ -12,8 +12,20 @@ class QuotesCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.post_channel_id = None
+
+    async def cog_load(self):
         self.quote_loop.start()
 
+    def cog_unload(self):
+        self.quote_loop.cancel()
+
+    # State handed over on /cog-reload
+    def export_state(self) -> dict:
+        return {"post_channel_id": self.post_channel_id}
+
+    def import_state(self, state: dict):
+        self.post_channel_id = state.get("post_channel_id")
+
     # -----------------------------
     # Scheduled quote/fact posting
     # -----------------------------
@@ -1,37 +1,18 @@
+import logging
 import discord
-import os
-import json
 from discord.ext import commands
 from discord import app_commands
 from utils.embed_utils import create_modern_embed
+from utils import database, persistence
 
-# -------------------------
-# Data Storage
-# -------------------------
-BASE_DIR = "data/guilds/roles/"
-os.makedirs(BASE_DIR, exist_ok=True)
-
-def guild_file(gid: int):
-    return f"{BASE_DIR}/{gid}.json"
-
-def load_roles(gid: int):
-    path = guild_file(gid)
-    if not os.path.exists(path):
-        return []
-    with open(path, "r") as f:
-        return json.load(f)
-
-def save_roles(gid: int, data: list):
-    with open(guild_file(gid), "w") as f:
-        json.dump(data, f, indent=4)
+log = logging.getLogger(f"CM-V5.4.{__name__}")
 
 # -----------------------------
 # Role Select Menu
 # -----------------------------
 class RoleSelectorMenu(discord.ui.Select):
-    def __init__(self, guild: discord.Guild):
+    def __init__(self, guild: discord.Guild, roles: list[int]):
         self.guild = guild
-        roles = load_roles(guild.id)
         options = []
         for rid in roles:
             role = guild.get_role(rid)
@@ -73,9 +54,9 @@ class RoleSelectorMenu(discord.ui.Select):
 # Persistent View
 # -----------------------------
 class RoleSelectorView(discord.ui.View):
-    def __init__(self, bot, guild: discord.Guild):
+    def __init__(self, bot, guild: discord.Guild, roles: list[int]):
         super().__init__(timeout=None)
-        self.add_item(RoleSelectorMenu(guild))
+        self.add_item(RoleSelectorMenu(guild, roles))
         bot.add_view(self)  # persistent view
 
 # -----------------------------
@@ -84,14 +65,19 @@ class RoleSelectorView(discord.ui.View):
 class RoleSelector(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.roles: dict[int, list[int]] = {}   # guild_id -> selector role ids, in order
+
+    async def cog_load(self):
+        # One query for every guild, off the event loop
+        self.roles = await persistence.run(database.load_all_selector_roles)
 
     @commands.Cog.listener()
     async def on_ready(self):
         # Load persistent views for all guilds
         for guild in self.bot.guilds:
-            if load_roles(guild.id):
-                RoleSelectorView(self.bot, guild)
-        print("Persistent role selector loaded for all guilds.")
+            if self.roles.get(guild.id):
+                RoleSelectorView(self.bot, guild, self.roles[guild.id])
+        log.info("Persistent role selector loaded for all guilds.")
 
     # -----------------------------
     # Add Role
@@ -99,10 +85,12 @@ class RoleSelector(commands.Cog):
     @app_commands.command(name="roleselect_add", description="Add a role to the selector")
     @app_commands.checks.has_permissions(administrator=True)
     async def add_role(self, interaction: discord.Interaction, role: discord.Role):
-        roles = load_roles(interaction.guild_id)
-        if role.id not in roles:
-            roles.append(role.id)
-            save_roles(interaction.guild_id, roles)
+        await persistence.save(
+            f"selector:{interaction.guild_id}:{role.id}", database.add_selector_role, interaction.guild_id, role.id
+        )
+        guild_roles = self.roles.setdefault(interaction.guild_id, [])
+        if role.id not in guild_roles:
+            guild_roles.append(role.id)
 
         embed = create_modern_embed(
             title="Role Added",
@@ -116,10 +104,11 @@ class RoleSelector(commands.Cog):
     @app_commands.command(name="roleselect_remove", description="Remove a role from the selector")
     @app_commands.checks.has_permissions(administrator=True)
     async def remove_role(self, interaction: discord.Interaction, role: discord.Role):
-        roles = load_roles(interaction.guild_id)
-        if role.id in roles:
-            roles.remove(role.id)
-            save_roles(interaction.guild_id, roles)
+        await persistence.save(
+            f"selector:{interaction.guild_id}:{role.id}", database.remove_selector_role, interaction.guild_id, role.id
+        )
+        if role.id in self.roles.get(interaction.guild_id, []):
+            self.roles[interaction.guild_id].remove(role.id)
 
         embed = create_modern_embed(
             title="Role Removed",
@@ -137,7 +126,7 @@ class RoleSelector(commands.Cog):
             title="Role Selector",
             description="Select your roles from the dropdown below!"
         )
-        view = RoleSelectorView(self.bot, interaction.guild)
+        view = RoleSelectorView(self.bot, interaction.guild, self.roles.get(interaction.guild_id, []))
         await interaction.response.send_message(embed=embed, view=view)
 
 async def setup(bot):
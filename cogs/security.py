@@ -2,15 +2,14 @@ import discord
 from discord.ext import commands, tasks
 from collections import deque, defaultdict
 from datetime import datetime, timezone, timedelta
-import time, json, re
-import os
+import time, re
+import logging
 
 # Utils
 from utils.embed_utils import create_modern_embed
+from utils.storage import get_guild_config
 
-# Ensure guild data folder exists
-GUILD_DATA_FOLDER = "guild_data"
-os.makedirs(GUILD_DATA_FOLDER, exist_ok=True)
+log = logging.getLogger(f"CM-V5.4.{__name__}")
 
 BLOCKED_FILE_PATTERNS = [
     r"\.exe$", r"\.bat$", r"\.cmd$", r"\.dll$", r"\.sh$", r"\.js$", r"\.scr$", r"\.vbs$",
@@ -21,35 +20,6 @@ BLACKLISTED_WORDS = [
     "malware", "virus", "trojan", "hacktool", "keygen", "crack", "cheat", "phish","discord.gg",
 ]
 
-# Default per-guild config template
-DEFAULT_GUILD_CONFIG = {
-    "raid_window_seconds": 10,
-    "raid_join_threshold": 5,
-    "min_account_age_days": 7,
-    "logging_channels": {
-        "security-log": None,
-        "audit-log": None
-    }
-}
-
-def get_guild_config(guild_id: int):
-    """Load or create a per-guild JSON config file."""
-    guild_file = os.path.join(GUILD_DATA_FOLDER, f"{guild_id}-config.json")
-    
-    # Create default file if missing
-    if not os.path.isfile(guild_file):
-        with open(guild_file, "w") as f:
-            json.dump(DEFAULT_GUILD_CONFIG, f, indent=4)
-    
-    # Load config
-    with open(guild_file, "r") as f:
-        return json.load(f)
-
-def save_guild_config(guild_id: int, data: dict):
-    guild_file = os.path.join(GUILD_DATA_FOLDER, f"{guild_id}-config.json")
-    with open(guild_file, "w") as f:
-        json.dump(data, f, indent=4)
-
 
 class SecurityCog(commands.Cog):
     """Security cog with fully working 1-minute timeout and logging."""
@@ -58,11 +28,28 @@ class SecurityCog(commands.Cog):
         self.bot = bot
         self.joins = defaultdict(lambda: deque())
         self.msgs = defaultdict(lambda: defaultdict(list))
+
+    async def cog_load(self):
         self.cleanup_cache.start()
 
     def cog_unload(self):
         self.cleanup_cache.cancel()
 
+    # State handed over on /cog-reload, so a deploy keeps the anti-raid windows
+    def export_state(self) -> dict:
+        return {"joins": self.joins, "msgs": self.msgs}
+
+    def import_state(self, state: dict):
+        self.joins.update(state.get("joins", {}))
+        self.msgs.update(state.get("msgs", {}))
+
+    def memory_stats(self) -> dict:
+        return {
+            "joins": sum(len(dq) for dq in self.joins.values()),
+            "msgs": sum(len(h) for users in self.msgs.values() for h in users.values()),
+            "msgs_users": sum(len(users) for users in self.msgs.values()),
+        }
+
     @tasks.loop(seconds=30)
     async def cleanup_cache(self):
         cutoff = time.time() - 3600
@@ -76,8 +63,7 @@ class SecurityCog(commands.Cog):
     # Utilities
     # -----------------
     def _get_channel(self, guild: discord.Guild, key: str):
-        settings = get_guild_config(guild.id)
-        ch_id = settings.get("logging_channels", {}).get(key)
+        ch_id = get_guild_config(guild.id)["logging"].get(key)
         return guild.get_channel(ch_id) if ch_id else None
 
     async def _send_alert(self, guild, title, description, color, emoji="⚠️"):
@@ -99,28 +85,28 @@ class SecurityCog(commands.Cog):
     async def _apply_timeout(self, member: discord.Member, reason: str, seconds: int = 60):
         """Safely apply a timeout to a member, handling permissions and roles, with logging."""
         if not isinstance(member, discord.Member):
-            print(f"[SECURITY] Not a valid member: {member}")
+            log.warning(f"Not a valid member: {member}")
             return
 
         bot_member = member.guild.me
 
         if not bot_member.guild_permissions.moderate_members:
-            print(f"[SECURITY] Cannot timeout {member}: missing Moderate Members permission")
+            log.warning(f"Cannot timeout {member}: missing Moderate Members permission")
             return
 
         if bot_member.top_role <= member.top_role:
-            print(f"[SECURITY] Cannot timeout {member}: role too high")
+            log.warning(f"Cannot timeout {member}: role too high")
             return
 
         until = datetime.now(timezone.utc) + timedelta(seconds=seconds)
         try:
             await member.timeout(until, reason=reason)
-            print(f"[SECURITY] Timed out {member} for {seconds}s: {reason}")
+            log.info(f"Timed out {member} for {seconds}s: {reason}")
             await self._log_timeout(member, reason, seconds)
         except discord.Forbidden:
-            print(f"[SECURITY] Cannot timeout {member}: Forbidden by Discord")
+            log.warning(f"Cannot timeout {member}: Forbidden by Discord")
         except discord.HTTPException as e:
-            print(f"[SECURITY] Failed to timeout {member}: {e}")
+            log.error(f"Failed to timeout {member}: {e}")
 
     # -----------------
     # Member join
@@ -131,18 +117,18 @@ class SecurityCog(commands.Cog):
         now = time.time()
         self.joins[guild.id].append(now)
 
-        config = get_guild_config(guild.id)
+        config = get_guild_config(guild.id)["security"]
 
         # Anti-raid
-        raid_window = config.get("raid_window_seconds", 10)
-        raid_threshold = config.get("raid_join_threshold", 5)
+        raid_window = config["raid_window_seconds"]
+        raid_threshold = config["raid_join_threshold"]
         recent_joins = sum(1 for t in self.joins[guild.id] if t >= now - raid_window)
         if recent_joins >= raid_threshold:
             desc = f"🚨 **Possible Raid:** {recent_joins} joins in {raid_window}s"
             await self._send_alert(guild, "Possible Raid Detected", desc, discord.Color.red())
 
         # Alt detection
-        min_age_days = config.get("min_account_age_days", 7)
+        min_age_days = config["min_account_age_days"]
         age_days = (datetime.now(timezone.utc) - member.created_at).days
         if age_days < min_age_days:
             desc = f"⚠️ **Alt Detected:** {member} — Account age: {age_days} days"
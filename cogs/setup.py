@@ -1,7 +1,7 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-from utils.storage import get_guild_settings, set_guild_settings
+from utils.storage import get_guild_config, transaction, update_section
 from utils.embed_utils import create_modern_embed
 
 # All logging types
@@ -57,12 +57,8 @@ class LogTypeDropdown(discord.ui.Select):
 
         ch = msg.channel_mentions[0]
 
-        # Save to JSON
-        settings = get_guild_settings(interaction.guild.id)
-        logging_channels = settings.get("logging_channels", {})
-        logging_channels[log_type] = ch.id
-        settings["logging_channels"] = logging_channels
-        set_guild_settings(interaction.guild.id, settings)
+        # Save to the guild's logging section
+        await update_section(interaction.guild.id, "logging", **{log_type: ch.id})
 
         # Confirmation
         confirm_embed = create_modern_embed(
@@ -122,8 +118,7 @@ class SetupCog(commands.Cog):
     @app_commands.checks.has_permissions(administrator=True)
     async def setup_auto(self, interaction: discord.Interaction):
         guild = interaction.guild
-        settings = get_guild_settings(guild.id)
-        logging_channels = settings.get("logging_channels", {})
+        logging_channels = get_guild_config(guild.id)["logging"]
 
         # Defer interaction to avoid timeout
         await interaction.response.defer(ephemeral=True)
@@ -139,6 +134,7 @@ class SetupCog(commands.Cog):
             category = await guild.create_category(category_name, overwrites=overwrites)
 
         created_channels = []
+        created_ids = {}
         for log_type in LOG_TYPES:
             if log_type in logging_channels and guild.get_channel(logging_channels[log_type]):
                 continue
@@ -148,11 +144,15 @@ class SetupCog(commands.Cog):
                 guild.me: discord.PermissionOverwrite(view_channel=True, send_messages=True)
             }
             channel = await guild.create_text_channel(channel_name, category=category, overwrites=overwrites)
-            logging_channels[log_type] = channel.id
+            created_ids[log_type] = channel.id
             created_channels.append(channel.name)
 
-        settings["logging_channels"] = logging_channels
-        set_guild_settings(guild.id, settings)
+        # Only store what was created here; channels set meanwhile via /setup are kept
+        async with transaction(guild.id) as settings:
+            configured = settings.setdefault("logging", {})
+            for log_type, channel_id in created_ids.items():
+                if not guild.get_channel(configured.get(log_type) or 0):
+                    configured[log_type] = channel_id
 
         # Confirmation
         embed = create_modern_embed(
@@ -1,27 +1,8 @@
 import discord
 from discord.ext import commands
 from discord import app_commands
-import json
-import os
 from utils.embed_utils import create_modern_embed
-
-DATA_FOLDER = "data/guilds"
-os.makedirs(DATA_FOLDER, exist_ok=True)
-
-def get_guild_file(guild_id: int):
-    return os.path.join(DATA_FOLDER, f"{guild_id}.json")
-
-def load_guild_data(guild_id: int):
-    path = get_guild_file(guild_id)
-    if not os.path.exists(path):
-        return {}
-    with open(path, "r") as f:
-        return json.load(f)
-
-def save_guild_data(guild_id: int, data: dict):
-    path = get_guild_file(guild_id)
-    with open(path, "w") as f:
-        json.dump(data, f, indent=4)
+from utils.storage import get_guild_config, update_section
 
 class JoinLeaveCog(commands.Cog):
     """Join/Leave logging with persistent guild config and clean embeds."""
@@ -34,9 +15,7 @@ class JoinLeaveCog(commands.Cog):
     # -------------------
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
-        guild_id = member.guild.id
-        data = load_guild_data(guild_id)
-        channel_id = data.get("joinleave_channel")
+        channel_id = get_guild_config(member.guild.id)["joinleave"]["channel"]
         if not channel_id:
             return  # Channel not configured
 
@@ -56,9 +35,7 @@ class JoinLeaveCog(commands.Cog):
     # -------------------
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member):
-        guild_id = member.guild.id
-        data = load_guild_data(guild_id)
-        channel_id = data.get("joinleave_channel")
+        channel_id = get_guild_config(member.guild.id)["joinleave"]["channel"]
         if not channel_id:
             return
 
@@ -80,9 +57,7 @@ class JoinLeaveCog(commands.Cog):
     @app_commands.describe(channel="Select the text channel for join/leave messages")
     @app_commands.checks.has_permissions(administrator=True)
     async def joinleave_setup(self, interaction: discord.Interaction, channel: discord.TextChannel):
-        data = load_guild_data(interaction.guild.id)
-        data["joinleave_channel"] = channel.id
-        save_guild_data(interaction.guild.id, data)
+        await update_section(interaction.guild.id, "joinleave", channel=channel.id)
 
         embed = create_modern_embed(
             title="Join/Leave Channel Configured",
@@ -1,7 +1,10 @@
+import logging
 import discord
 from discord.ext import commands
 from utils.embed_utils import create_modern_embed
 
+log = logging.getLogger(f"CM-V5.4.{__name__}")
+
 # Replace these with your actual support server link and GitHub repo
 SUPPORT_SERVER_LINK = "https://discord.gg/x2n5RF6fKd"
 GITHUB_REPO_LINK = "https://github.com/Rathio12/CM-V5-/blob/main/README.MD"  # <-- replace with your repo
@@ -38,7 +41,7 @@ class WelcomeCog(commands.Cog):
 
             await owner.send(embed=embed)
         except discord.Forbidden:
-            print(f"[WELCOME] Could not DM owner of {guild.name} ({owner})")
+            log.warning(f"Could not DM owner of {guild.name} ({owner})")
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(WelcomeCog(bot))
@@ -0,0 +1,88 @@
+"""Run the bot as several worker processes, each owning a contiguous range of shards.
+
+    python launcher.py
+
+Environment:
+    CLUSTERS      number of worker processes (default: CPU count)
+    SHARD_COUNT   total shards across all workers (default: Discord's recommendation)
+    CLUSTER_IPC   host:port of the local stats channel (default: 127.0.0.1:7420)
+
+Each worker is a normal bot.py process started with SHARD_COUNT, SHARD_IDS,
+CLUSTER_ID and CLUSTER_IPC set. Crashed workers are restarted with a backoff.
+"""
+import asyncio
+import logging
+import os
+import sys
+
+import requests
+from dotenv import load_dotenv
+
+# Before the utils imports and setup_logging(), which read their settings from the environment
+load_dotenv()
+
+from utils.cluster import ClusterStatsServer, format_shard_ids, parse_address, shard_ranges
+from utils.migrate import migrate_if_needed
+from utils.logging_setup import setup_logging
+
+setup_logging()
+log = logging.getLogger("CM-V5.4.launcher")
+
+TOKEN = os.getenv("DISCORD_TOKEN")
+if not TOKEN:
+    raise SystemExit("DISCORD_TOKEN not set in environment variables.")
+
+CLUSTERS = int(os.getenv("CLUSTERS", os.cpu_count() or 1))
+CLUSTER_IPC = os.getenv("CLUSTER_IPC", "127.0.0.1:7420")
+RESTART_DELAY = 5       # seconds before restarting a crashed worker (doubles per crash)
+MAX_RESTART_DELAY = 300
+
+def recommended_shard_count() -> int:
+    """Ask Discord how many shards this bot should use."""
+    resp = requests.get(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {TOKEN}"},
+        timeout=10
+    )
+    resp.raise_for_status()
+    return resp.json()["shards"]
+
+async def run_worker(cluster_id: int, shard_ids: list[int], shard_count: int):
+    """Start one worker and keep it running."""
+    env = {
+        **os.environ,
+        "SHARD_COUNT": str(shard_count),
+        "SHARD_IDS": format_shard_ids(shard_ids),
+        "CLUSTER_ID": str(cluster_id),
+        "CLUSTER_IPC": CLUSTER_IPC,
+    }
+    delay = RESTART_DELAY
+    while True:
+        log.info(f"Starting cluster {cluster_id} with shards {shard_ids[0]}-{shard_ids[-1]}")
+        proc = await asyncio.create_subprocess_exec(sys.executable, "bot.py", env=env)
+        code = await proc.wait()
+        if code == 0:
+            log.info(f"Cluster {cluster_id} exited cleanly")
+            return
+        log.error(f"Cluster {cluster_id} exited with code {code}; restarting in {delay}s")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, MAX_RESTART_DELAY)
+
+async def main():
+    # requests blocks; ask Discord from a worker thread so the loop stays free
+    shard_count = int(os.getenv("SHARD_COUNT") or await asyncio.to_thread(recommended_shard_count))
+    ranges = shard_ranges(shard_count, CLUSTERS)
+    log.info(f"Launching {len(ranges)} clusters for {shard_count} shards")
+
+    # Run the one-shot JSON import here so workers don't race each other on it
+    migrate_if_needed()
+
+    server = ClusterStatsServer()
+    await server.start(*parse_address(CLUSTER_IPC))
+    try:
+        await asyncio.gather(*(run_worker(i, ids, shard_count) for i, ids in enumerate(ranges)))
+    finally:
+        await server.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# utils.database reads DATABASE_PATH at import; keep test writes out of data/
+os.environ.setdefault("DATABASE_PATH", os.path.join(tempfile.mkdtemp(prefix="cmv5-tests-"), "test.db"))
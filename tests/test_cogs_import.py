@@ -0,0 +1,15 @@
+import importlib
+import pkgutil
+from pathlib import Path
+
+import pytest
+
+COGS = sorted(info.name for info in pkgutil.iter_modules([str(Path(__file__).parent.parent / "cogs")]))
+
+@pytest.mark.parametrize("name", COGS)
+def test_cog_module_imports(name):
+    # discord.py validates command/listener names while the class body runs,
+    # so a bad cog fails here instead of silently at load_extension time
+    pytest.importorskip("discord")
+    module = importlib.import_module(f"cogs.{name}")
+    assert callable(getattr(module, "setup", None))
@@ -0,0 +1,30 @@
+from utils.level_curve import MAX_LEVEL, MIN_BASE, MIN_EXPONENT, LevelCurve, curve_for_config
+
+def reference_level(xp: int) -> int:
+    """The original step-by-step curve walk."""
+    level = 0
+    while xp >= int(100 * (level + 1) ** 1.5):
+        xp -= int(100 * (level + 1) ** 1.5)
+        level += 1
+    return level
+
+def test_default_curve_matches_original():
+    curve = LevelCurve()
+    for xp in list(range(0, 5000)) + [123_456, 2_000_000]:
+        assert curve.level_for(xp) == reference_level(xp)
+
+def test_progress():
+    assert LevelCurve().progress(150) == (1, 50, 282)
+
+def test_flat_curve_table_is_capped():
+    curve = LevelCurve(1, 0.0)   # every level costs 1 XP
+    assert curve.level_for(3_000_000) == MAX_LEVEL
+    assert curve.levels_for([5, 3_000_000]) == [5, MAX_LEVEL]
+    assert curve.threshold(10**9) == curve.threshold(MAX_LEVEL + 1)
+    assert len(curve._totals) <= MAX_LEVEL + 2
+    level, done, needed = curve.progress(3_000_000)
+    assert level == MAX_LEVEL and done == needed
+
+def test_guild_config_is_clamped_to_minimums():
+    curve = curve_for_config({"leveling": {"curve_base": 1, "curve_exponent": 0.0}})
+    assert (curve.base, curve.exponent) == (MIN_BASE, MIN_EXPONENT)
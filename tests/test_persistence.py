@@ -0,0 +1,54 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from utils import persistence
+
+def test_saves_of_one_key_coalesce_and_land_the_last_value():
+    written = []
+    started, release = threading.Event(), threading.Event()
+
+    def write(value):
+        if value == 0:
+            # Hold the first write so the next ones queue up behind it
+            started.set()
+            release.wait(5)
+        written.append(value)
+
+    async def scenario():
+        first = asyncio.ensure_future(persistence.save("coalesce", write, 0))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        rest = [asyncio.ensure_future(persistence.save("coalesce", write, i)) for i in range(1, 10)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, *rest)
+
+    asyncio.run(scenario())
+    assert written == [0, 9]
+
+def test_save_failure_reaches_the_caller():
+    def write():
+        raise OSError("disk full")
+
+    async def scenario():
+        with pytest.raises(OSError):
+            await persistence.save("failing", write)
+
+    asyncio.run(scenario())
+
+def test_save_json_leaves_only_the_final_file(tmp_path):
+    path = tmp_path / "data.json"
+
+    async def scenario():
+        await asyncio.gather(*(persistence.save_json(path, {"n": i}) for i in range(5)))
+
+    asyncio.run(scenario())
+    assert json.loads(path.read_text()) == {"n": 4}
+    assert [p.name for p in tmp_path.iterdir()] == ["data.json"]
+
+def test_schedule_without_a_loop_writes_inline():
+    written = []
+    assert persistence.schedule("inline", written.append, 1) is None
+    assert written == [1]
@@ -0,0 +1,80 @@
+import random
+from array import array
+
+import pytest
+
+from utils import rank_index
+from utils.rank_index import RankIndex
+from utils.xp_store import GuildLevels
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    # Tiny blocks so a few hundred members exercise splits, merges and block edges
+    monkeypatch.setattr(rank_index, "LOAD", 4)
+
+def expected_order(store: GuildLevels) -> list[tuple[int, int]]:
+    return sorted(((user_id, xp) for user_id, xp, _ in store), key=lambda row: (-row[1], row[0]))
+
+def listed(index: RankIndex) -> list[tuple[int, int]]:
+    return [(user_id, xp) for _, user_id, xp in index.slice(0, len(index))]
+
+def make_store(rng: random.Random, members: int = 60) -> GuildLevels:
+    return GuildLevels((rng.randrange(1, 10**18), rng.randrange(0, 100), 0) for _ in range(members))
+
+def test_order_matches_a_full_sort_after_updates():
+    rng = random.Random(5)
+    store = make_store(rng)
+    index = RankIndex(store)
+    for _ in range(3000):
+        if rng.random() < 0.05:
+            user_id, old_xp = rng.randrange(1, 10**18), None
+        else:
+            user_id = store.user_ids[rng.randrange(len(store))]
+            old_xp = store.get_xp(user_id)
+        before = [user_id for user_id, _ in listed(index)]
+        slot = store.add_xp(user_id, rng.randrange(0, 30))
+        moved = index.update(user_id, old_xp, store.xp[slot], slot)
+
+        order = expected_order(store)
+        assert listed(index) == order
+        after = [user_id for user_id, _ in order]
+        changed = [rank for rank, user_id in enumerate(after, 1) if rank > len(before) or before[rank - 1] != user_id]
+        if changed:
+            # Every rank that changed hands lies in the reported range
+            assert moved[0] <= min(changed) and max(changed) <= moved[1]
+
+def test_xp_loss_moves_a_member_down():
+    store = GuildLevels([(1, 50, 0), (2, 40, 0), (3, 30, 0)])
+    index = RankIndex(store)
+    slot = store.slot(1)
+    store.xp[slot] = 10
+    assert index.update(1, 50, 10, slot) == (1, 3)
+    assert [user_id for _, user_id, _ in index.top(3)] == [2, 3, 1]
+
+def test_rank_pages_and_neighbours():
+    store = GuildLevels((user_id, 1000 - user_id, 0) for user_id in range(1, 26))
+    index = RankIndex(store)
+    assert len(index) == 25 and index.page_count() == 3
+    assert index.rank(7) == 7 and index.rank(99) is None
+    assert [rank for rank, _, _ in index.page(3)] == [21, 22, 23, 24, 25]
+    assert [user_id for _, user_id, _ in index.around(1)] == [1, 2, 3]
+    assert [user_id for _, user_id, _ in index.around(10, radius=1)] == [9, 10, 11]
+
+def test_index_built_from_a_copy_catches_up_with_the_store():
+    rng = random.Random(9)
+    store = make_store(rng, 80)
+    xps = array("Q", store.xp)
+    # XP earned and members added while the index was being built elsewhere
+    for _ in range(40):
+        store.add_xp(store.user_ids[rng.randrange(len(store))], rng.randrange(1, 50))
+    for _ in range(10):
+        store.add_xp(rng.randrange(1, 10**18), rng.randrange(1, 200))
+    index = RankIndex(store, xps)
+    index.catch_up()
+    assert listed(index) == expected_order(store)
+
+    user_id = store.user_ids[0]
+    old_xp = store.get_xp(user_id)
+    slot = store.add_xp(user_id, 500)
+    index.update(user_id, old_xp, store.xp[slot], slot)
+    assert index.rank(user_id) == 1
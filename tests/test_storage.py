@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from utils import database, persistence, storage
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    # Each test runs its own event loop; a timer left from another loop would never fire
+    monkeypatch.setattr(storage, "_flush_handle", None)
+    monkeypatch.setattr(storage, "FLUSH_DELAY", 0.05)
+    storage._cache.clear()
+    storage._snapshots.clear()
+    storage._last_access.clear()
+    storage._dirty.clear()
+
+async def settle():
+    """Let the debounce timer fire and every queued write land."""
+    await asyncio.sleep(storage.FLUSH_DELAY * 2)
+    await persistence.wait_idle()
+    await asyncio.sleep(0)   # done callbacks of the writes
+
+def test_changes_are_written_once_after_the_debounce():
+    async def scenario():
+        storage.set_guild_settings(101, {"config_channel": 1})
+        storage.set_guild_settings(101, {"config_channel": 2})
+        assert database.load_settings(101) is None
+        await settle()
+
+    asyncio.run(scenario())
+    assert database.load_settings(101) == {"config_channel": 2}
+    assert storage.get_cache_stats()["dirty"] == 0
+
+def test_failed_write_stays_dirty_and_is_retried(monkeypatch):
+    failures = [OSError("disk full")]
+
+    def write(guild_id, settings):
+        if failures:
+            raise failures.pop()
+        database.save_settings(guild_id, settings)
+
+    monkeypatch.setattr(storage, "_write_guild_settings", write)
+
+    async def scenario():
+        storage.set_guild_settings(102, {"config_channel": 5})
+        # Run the first attempt now rather than racing its timer against the retry's
+        storage._flush_handle.cancel()
+        storage._run_scheduled_flush()
+        await persistence.wait_idle()
+        await asyncio.sleep(0)
+        assert 102 in storage._dirty
+        await settle()   # the flush the failure scheduled
+
+    asyncio.run(scenario())
+    assert database.load_settings(102) == {"config_channel": 5}
+    assert 102 not in storage._dirty
+
+# -----------------------
+# Transactions
+# -----------------------
+def test_transactions_on_one_guild_run_one_after_another():
+    async def bump():
+        async with storage.transaction(201) as settings:
+            count = settings.get("count", 0)
+            await asyncio.sleep(0)   # without the lock every bump would read the same count
+            settings["count"] = count + 1
+
+    async def scenario():
+        await asyncio.gather(*(bump() for _ in range(20)))
+
+    asyncio.run(scenario())
+    assert storage.get_guild_config(201)["count"] == 20
+
+def test_other_guilds_do_not_wait_on_a_transaction():
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            async with storage.transaction(202) as settings:
+                await release.wait()
+                settings["config_channel"] = 1
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        await asyncio.wait_for(storage.update_section(203, "leveling", channel=7), timeout=1)
+        release.set()
+        await holder
+
+    asyncio.run(scenario())
+    assert storage.get_guild_config(203)["leveling"]["channel"] == 7
+    assert storage.get_guild_config(202)["config_channel"] == 1
+
+def test_failed_transaction_stores_nothing():
+    async def scenario():
+        await storage.update_section(204, "leveling", channel=1)
+        with pytest.raises(RuntimeError):
+            async with storage.transaction(204) as settings:
+                settings["leveling"]["channel"] = 2
+                raise RuntimeError("abort")
+
+    asyncio.run(scenario())
+    assert storage.get_guild_config(204)["leveling"]["channel"] == 1
+
+def test_update_section_merges_into_defaults():
+    asyncio.run(storage.update_section(205, "security", raid_join_threshold=9))
+    security = storage.get_guild_config(205)["security"]
+    assert security["raid_join_threshold"] == 9
+    assert security["raid_window_seconds"] == storage.DEFAULT_SECTIONS["security"]["raid_window_seconds"]
+    with pytest.raises(KeyError):
+        asyncio.run(storage.update_section(205, "nope", value=1))
@@ -0,0 +1,37 @@
+import random
+
+from utils.xp_store import GuildLevels, load_guilds
+
+def snowflakes(count: int, seed: int = 1) -> list[int]:
+    """Discord-like ids: timestamp in the high bits, low bits mostly zero."""
+    rng = random.Random(seed)
+    return [(rng.randrange(10**12, 2 * 10**12) << 22) | rng.randrange(0, 4) for _ in range(count)]
+
+def test_values_round_trip_through_table_growth():
+    store = GuildLevels()
+    ids = list(dict.fromkeys(snowflakes(5000)))
+    for i, user_id in enumerate(ids):
+        store.set(user_id, i * 7, i % 50)
+    assert len(store) == len(ids)
+    assert len(store._table) >= 2 * len(store)
+    for i, user_id in enumerate(ids):
+        assert store.get(user_id) == (i * 7, i % 50)
+        assert user_id in store
+    assert store.get(12345) is None and store.get_xp(12345) is None
+    assert [row[0] for row in store] == ids   # insertion order
+
+def test_set_updates_in_place_and_add_xp_tracks_new_members():
+    store = GuildLevels([(1, 10, 1), (2, 20, 2)])
+    slot = store.slot(1)
+    assert store.set(1, 99, 4) == slot and len(store) == 2
+    assert store.get(1) == (99, 4)
+    store.add_xp(1, 1)
+    new_slot = store.add_xp(3, 15)
+    assert store.get(1) == (100, 4)
+    assert store.get(3) == (15, 0) and new_slot == 2
+
+def test_load_guilds_groups_rows_by_guild():
+    guilds = load_guilds([(1, 10, 5, 0), (2, 10, 7, 1), (1, 11, 9, 2)])
+    assert sorted(guilds) == [1, 2]
+    assert list(guilds[1]) == [(10, 5, 0), (11, 9, 2)]
+    assert guilds[2].get(10) == (7, 1)
@@ -0,0 +1,168 @@
+"""Per-cog latency/error budgets with a circuit breaker around listeners.
+
+Every listener call is scored against its cog's budget: slower than slow_ms
+or raising counts against it. When the slow or error ratio over the last
+`window` calls goes over budget, the breaker opens and the cog's listeners are
+skipped for `cooldown` seconds (doubling on every trip in a row, up to
+max_cooldown). Afterwards a single trial call decides whether it closes again.
+
+Listeners of unprotected cogs also get a timeout: past it the call counts as
+failed and is no longer awaited, but it is left to finish rather than
+cancelled. PROTECTED_COGS (moderation and anti-phishing paths) are measured and
+reported but never shed or timed out.
+
+Budgets can be overridden per cog with COG_BUDGETS, a JSON object, e.g.
+    COG_BUDGETS='{"LevelingCog": {"slow_ms": 100}, "QuotesCog": {"timeout": 5}}'
+"""
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from typing import Callable
+
+log = logging.getLogger("CM-V5.4")
+
+PROTECTED_COGS = {"SecurityCog", "AntiPhishing", "ModerationCog", "CogManager"}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+@dataclass(frozen=True)
+class Budget:
+    slow_ms: float = 500           # a call slower than this counts as slow
+    max_slow_ratio: float = 0.5    # over the window
+    max_error_ratio: float = 0.2
+    window: int = 50               # calls considered
+    min_calls: int = 20            # don't judge before this many calls
+    timeout: float = 15.0          # stop waiting on a listener call after this (unprotected cogs)
+    cooldown: float = 60.0         # seconds shed after the first trip
+    max_cooldown: float = 900.0
+
+DEFAULT_BUDGET = Budget()
+
+def _load_overrides() -> dict[str, Budget]:
+    raw = os.getenv("COG_BUDGETS")
+    if not raw:
+        return {}
+    try:
+        return {cog: replace(DEFAULT_BUDGET, **values) for cog, values in json.loads(raw).items()}
+    except (ValueError, TypeError) as e:
+        log.error(f"Ignoring invalid COG_BUDGETS: {e}")
+        return {}
+
+_overrides = _load_overrides()
+_listeners: list[Callable[["CogBreaker", str], None]] = []
+
+def on_state_change(callback: Callable[["CogBreaker", str], None]):
+    """callback(breaker, previous_state) runs whenever a breaker opens or closes."""
+    _listeners.append(callback)
+
+def remove_state_listener(callback):
+    if callback in _listeners:
+        _listeners.remove(callback)
+
+class CogBreaker:
+    def __init__(self, cog_name: str, budget: Budget):
+        self.cog_name = cog_name
+        self.budget = budget
+        self.protected = cog_name in PROTECTED_COGS
+        self.state = CLOSED
+        self.trips = 0             # consecutive trips, drives the cooldown
+        self.shed = 0              # calls skipped while open
+        self.reason = ""
+        self._calls: deque[tuple[bool, bool]] = deque()
+        self._slow = 0
+        self._errors = 0
+        self._open_until = 0.0
+        self._trial_running = False
+
+    @property
+    def timeout(self) -> float | None:
+        return None if self.protected else self.budget.timeout
+
+    def allow(self) -> bool:
+        """Whether a listener call may run now."""
+        if self.state == CLOSED or self.protected:
+            return True
+        if self.state == OPEN and time.monotonic() >= self._open_until:
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN and not self._trial_running:
+            self._trial_running = True
+            return True
+        self.shed += 1
+        return False
+
+    def record(self, seconds: float, failed: bool):
+        slow = seconds * 1000 > self.budget.slow_ms
+        if self.state == HALF_OPEN and self._trial_running:
+            self._trial_running = False
+            if slow or failed:
+                self._trip("trial call " + ("failed" if failed else f"took {seconds * 1000:.0f} ms"))
+            else:
+                self.trips = 0
+                self._reset_window()
+                self._set_state(CLOSED)
+            return
+
+        calls = self._calls
+        calls.append((slow, failed))
+        self._slow += slow
+        self._errors += failed
+        if len(calls) > self.budget.window:
+            old_slow, old_failed = calls.popleft()
+            self._slow -= old_slow
+            self._errors -= old_failed
+        if len(calls) < self.budget.min_calls or self.state != CLOSED:
+            return
+        if self._slow / len(calls) > self.budget.max_slow_ratio:
+            self._trip(f"{self._slow}/{len(calls)} calls over {self.budget.slow_ms:.0f} ms")
+        elif self._errors / len(calls) > self.budget.max_error_ratio:
+            self._trip(f"{self._errors}/{len(calls)} calls failed")
+
+    def _trip(self, reason: str):
+        self.reason = reason
+        self._reset_window()
+        if self.protected:
+            # Never shed; still tell the owner that a core path is over budget
+            log.warning(f"Protected cog {self.cog_name} over budget: {reason}")
+            for callback in list(_listeners):
+                callback(self, CLOSED)
+            return
+        cooldown = min(self.budget.cooldown * 2 ** self.trips, self.budget.max_cooldown)
+        self.trips += 1
+        self._open_until = time.monotonic() + cooldown
+        self._set_state(OPEN)
+        log.warning(f"Circuit open for {self.cog_name} ({reason}); shedding listeners for {cooldown:.0f}s")
+
+    def _reset_window(self):
+        self._calls.clear()
+        self._slow = self._errors = 0
+
+    def _set_state(self, state: str):
+        previous, self.state = self.state, state
+        if state == CLOSED:
+            self.shed = 0
+        if previous != state and state != HALF_OPEN:
+            for callback in list(_listeners):
+                callback(self, previous)
+
+    def describe(self) -> str:
+        window = len(self._calls)
+        text = f"{self.state}, {window} recent calls ({self._slow} slow, {self._errors} failed)"
+        if self.state != CLOSED:
+            text += f", {self.shed} shed, reopens in {max(0.0, self._open_until - time.monotonic()):.0f}s"
+        if self.reason:
+            text += f" — last trip: {self.reason}"
+        return text
+
+_breakers: dict[str, CogBreaker] = {}
+
+def breaker_for(cog_name: str) -> CogBreaker:
+    breaker = _breakers.get(cog_name)
+    if breaker is None:
+        breaker = _breakers[cog_name] = CogBreaker(cog_name, _overrides.get(cog_name, DEFAULT_BUDGET))
+    return breaker
+
+def all_breakers() -> list[CogBreaker]:
+    return list(_breakers.values())
@@ -0,0 +1,135 @@
+"""Gateway intents and cache settings derived from the cogs that are actually loaded.
+
+Each cog declares what it needs from the gateway. Profiles combine those needs:
+
+* ``auto``    - only the intents loaded cogs use; member/message caches only if a cog needs them
+* ``minimal`` - same intents, but no member chunking and a small message cache
+* ``full``    - the old behaviour: every intent, every cache
+
+Choose with the CACHE_PROFILE environment variable (default: auto).
+"""
+import logging
+import os
+from dataclasses import dataclass
+
+import discord
+
+log = logging.getLogger("CM-V5.4")
+
+DEFAULT_MAX_MESSAGES = 1000   # discord.py's default message cache
+MINIMAL_MAX_MESSAGES = 200
+
+
+@dataclass(frozen=True)
+class CogNeeds:
+    intents: tuple[str, ...] = ("guilds",)
+    member_cache: bool = False   # keeps members cached (e.g. on_member_update needs the "before" state)
+    chunk: bool = False          # needs the complete member list at startup
+    message_cache: bool = False  # reads cached messages (on_message_delete / on_message_edit content)
+
+
+# Keyed by extension module name (file name in ./cogs)
+COG_NEEDS = {
+    "anti_phising": CogNeeds(intents=("guilds", "guild_messages", "message_content")),
+    "autorole": CogNeeds(intents=("guilds", "members")),
+    "cog_manager": CogNeeds(intents=("guilds", "guild_messages", "message_content")),  # hybrid prefix commands
+    "custom_reminder": CogNeeds(),
+    "diagnostics": CogNeeds(intents=("guilds", "guild_messages", "message_content")),   # hybrid prefix commands
+    "fun": CogNeeds(intents=("guilds", "guild_messages", "message_content")),          # prefix commands
+    "github_searchs": CogNeeds(),
+    "guild_joins": CogNeeds(),
+    "leveling": CogNeeds(intents=("guilds", "members", "guild_messages"), member_cache=True),
+    "logging": CogNeeds(
+        intents=("guilds", "members", "bans", "emojis_and_stickers", "voice_states",
+                 "guild_messages", "message_content"),
+        member_cache=True, chunk=True, message_cache=True
+    ),
+    "moderation": CogNeeds(),
+    "quotes": CogNeeds(),
+    "role_selector": CogNeeds(),
+    "security": CogNeeds(intents=("guilds", "members", "guild_messages", "message_content")),
+    "setup": CogNeeds(intents=("guilds", "guild_messages", "message_content")),        # waits for a channel mention
+    "userjoin": CogNeeds(intents=("guilds", "members")),
+    "welcome": CogNeeds(intents=("guilds", "members"), member_cache=True),            # guild.owner lookup
+}
+
+
+@dataclass(frozen=True)
+class CacheProfile:
+    name: str
+    intents: discord.Intents
+    member_cache_flags: discord.MemberCacheFlags
+    max_messages: int | None
+    chunk_guilds_at_startup: bool
+
+    def bot_kwargs(self) -> dict:
+        return {
+            "intents": self.intents,
+            "member_cache_flags": self.member_cache_flags,
+            "max_messages": self.max_messages,
+            "chunk_guilds_at_startup": self.chunk_guilds_at_startup,
+        }
+
+    def describe(self) -> str:
+        enabled = sorted(name for name, value in self.intents if value)
+        return (
+            f"profile={self.name} intents=[{', '.join(enabled)}] "
+            f"max_messages={self.max_messages} chunk={self.chunk_guilds_at_startup}"
+        )
+
+
+def build_profile(extensions: list[str], name: str = "auto") -> CacheProfile:
+    """Build the cache profile for the given extension names (e.g. ["logging", "fun"])."""
+    if name == "full":
+        intents = discord.Intents.all()
+        return CacheProfile(name, intents, discord.MemberCacheFlags.from_intents(intents), DEFAULT_MAX_MESSAGES, True)
+
+    needs = []
+    for ext in extensions:
+        if ext not in COG_NEEDS:
+            log.warning(f"No cache requirements declared for cog '{ext}'; falling back to the full profile")
+            return build_profile(extensions, "full")
+        needs.append(COG_NEEDS[ext])
+
+    intents = discord.Intents.none()
+    for need in needs:
+        for intent in need.intents:
+            setattr(intents, intent, True)
+
+    member_cache = any(n.member_cache for n in needs) and intents.members
+    if member_cache:
+        member_flags = discord.MemberCacheFlags.from_intents(intents)
+    else:
+        member_flags = discord.MemberCacheFlags.none()
+    message_cache = any(n.message_cache for n in needs)
+    chunk = any(n.chunk for n in needs) and member_cache
+
+    if name == "minimal":
+        return CacheProfile(
+            name, intents, member_flags,
+            MINIMAL_MAX_MESSAGES if message_cache else None,
+            False
+        )
+    return CacheProfile(name, intents, member_flags, DEFAULT_MAX_MESSAGES if message_cache else None, chunk)
+
+
+# -----------------------
+# Memory report
+# -----------------------
+def rss_bytes() -> int:
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        import sys
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def memory_report(bot: discord.Client, profile: CacheProfile) -> str:
+    members = sum(len(g.members) for g in bot.guilds)
+    return (
+        f"[{profile.name}] rss={rss_bytes() / 2**20:.1f} MiB guilds={len(bot.guilds)} "
+        f"cached_members={members} users={len(bot.users)} cached_messages={len(bot.cached_messages)}"
+    )
@@ -0,0 +1,131 @@
+"""Helpers for running the bot as several shard-owning processes.
+
+launcher.py hosts a ClusterStatsServer; every worker (bot.py started with
+CLUSTER_ID / CLUSTER_IPC set) pushes its local guild and member counts through
+a ClusterStatsClient and gets the totals across all clusters back. The protocol
+is one JSON object per line over a local TCP socket.
+"""
+import asyncio
+import json
+import logging
+import time
+
+log = logging.getLogger("CM-V5.4")
+
+STALE_AFTER = 120  # Seconds before a silent cluster stops counting towards totals
+
+def parse_shard_ids(value: str) -> list[int]:
+    """Parse "0-3,8,10-11" into [0, 1, 2, 3, 8, 10, 11]."""
+    ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            ids.extend(range(int(start), int(end) + 1))
+        else:
+            ids.append(int(part))
+    return sorted(set(ids))
+
+def shard_ranges(shard_count: int, clusters: int) -> list[list[int]]:
+    """Split shard ids into contiguous, evenly sized groups (one per cluster)."""
+    clusters = max(1, min(clusters, shard_count))
+    size, extra = divmod(shard_count, clusters)
+    ranges, start = [], 0
+    for i in range(clusters):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+def format_shard_ids(ids: list[int]) -> str:
+    return ",".join(str(i) for i in ids)
+
+def parse_address(value: str) -> tuple[str, int]:
+    host, _, port = value.rpartition(":")
+    return host or "127.0.0.1", int(port)
+
+# -----------------------
+# Launcher side
+# -----------------------
+class ClusterStatsServer:
+    """Collects per-cluster stats and answers every report with the cluster-wide totals."""
+
+    def __init__(self):
+        self.stats: dict[int, dict] = {}
+        self._server: asyncio.AbstractServer | None = None
+
+    async def start(self, host: str, port: int):
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def totals(self) -> dict:
+        now = time.time()
+        live = [s for s in self.stats.values() if now - s["ts"] < STALE_AFTER]
+        return {
+            "clusters": len(live),
+            "guilds": sum(s["guilds"] for s in live),
+            "members": sum(s["members"] for s in live),
+            "shards": sum(s["shards"] for s in live),
+        }
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                try:
+                    msg = json.loads(line)
+                    self.stats[int(msg["cluster"])] = {
+                        "guilds": int(msg.get("guilds", 0)),
+                        "members": int(msg.get("members", 0)),
+                        "shards": int(msg.get("shards", 0)),
+                        "ts": time.time(),
+                    }
+                except (ValueError, KeyError, TypeError):
+                    continue
+                writer.write(json.dumps(self.totals()).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+# -----------------------
+# Worker side
+# -----------------------
+class ClusterStatsClient:
+    """Reports this process's stats to the launcher; returns None while it is unreachable."""
+
+    def __init__(self, address: str, cluster_id: int, timeout: float = 5.0):
+        self.host, self.port = parse_address(address)
+        self.cluster_id = cluster_id
+        self.timeout = timeout
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def exchange(self, guilds: int, members: int, shards: int) -> dict | None:
+        msg = {"cluster": self.cluster_id, "guilds": guilds, "members": members, "shards": shards}
+        try:
+            if self._writer is None:
+                self._reader, self._writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.host, self.port), self.timeout
+                )
+            self._writer.write(json.dumps(msg).encode("utf-8") + b"\n")
+            await self._writer.drain()
+            line = await asyncio.wait_for(self._reader.readline(), self.timeout)
+            if not line:
+                raise ConnectionError("launcher closed the stats connection")
+            return json.loads(line)
+        except (OSError, asyncio.TimeoutError, ValueError) as e:
+            log.warning(f"Cluster stats unavailable: {e}")
+            self.close()
+            return None
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
@@ -0,0 +1,124 @@
+"""Serialization codecs used by the storage helpers.
+
+Three codecs share one interface:
+
+* ``json``    - stdlib, always available
+* ``orjson``  - same JSON format, several times faster (optional dependency)
+* ``msgpack`` - compact binary format (optional dependency)
+
+Besides whole-object ``dumps``/``loads``, each codec can write and read a
+stream of records (JSON lines or back-to-back msgpack objects), so large data
+can be appended or iterated without holding one giant object in memory.
+"""
+import json
+import os
+from typing import Any, BinaryIO, Iterable, Iterator
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional
+    msgpack = None
+
+# "auto" picks the fastest installed JSON codec
+DEFAULT_CODEC = os.getenv("STORAGE_CODEC", "auto")
+
+
+class JsonCodec:
+    name = "json"
+    suffix = ".jsonl"
+    binary = False
+
+    def dumps(self, obj: Any, indent: int | None = None) -> bytes:
+        return json.dumps(obj, indent=indent, ensure_ascii=False).encode("utf-8")
+
+    def loads(self, data: bytes | str) -> Any:
+        return json.loads(data)
+
+    def write_stream(self, f: BinaryIO, records: Iterable[Any]) -> int:
+        """Write one JSON document per line; returns the number of records."""
+        count = 0
+        for record in records:
+            f.write(self.dumps(record) + b"\n")
+            count += 1
+        return count
+
+    def read_stream(self, f: BinaryIO) -> Iterator[Any]:
+        """Yield records line by line; a torn last line (crash mid-append) is skipped."""
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield self.loads(line)
+            except ValueError:
+                continue
+
+
+class OrjsonCodec(JsonCodec):
+    name = "orjson"
+
+    def dumps(self, obj: Any, indent: int | None = None) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+
+    def loads(self, data: bytes | str) -> Any:
+        return orjson.loads(data)
+
+
+class MsgpackCodec:
+    name = "msgpack"
+    suffix = ".msgpack"
+    binary = True
+
+    def dumps(self, obj: Any, indent: int | None = None) -> bytes:
+        return msgpack.packb(obj, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        # Dict keys may be ints after a round trip through JSON-shaped data
+        return msgpack.unpackb(data, raw=False, strict_map_key=False)
+
+    def write_stream(self, f: BinaryIO, records: Iterable[Any]) -> int:
+        packer = msgpack.Packer(use_bin_type=True)
+        count = 0
+        for record in records:
+            f.write(packer.pack(record))
+            count += 1
+        return count
+
+    def read_stream(self, f: BinaryIO) -> Iterator[Any]:
+        yield from msgpack.Unpacker(f, raw=False, strict_map_key=False)
+
+
+_CODECS = {"json": JsonCodec()}
+if orjson is not None:
+    _CODECS["orjson"] = OrjsonCodec()
+if msgpack is not None:
+    _CODECS["msgpack"] = MsgpackCodec()
+
+
+def available_codecs() -> list[str]:
+    return list(_CODECS)
+
+def get_codec(name: str | None = None):
+    """Return a codec by name; unknown or missing codecs fall back to stdlib json."""
+    name = name or DEFAULT_CODEC
+    if name == "auto":
+        return json_codec()
+    return _CODECS.get(name, _CODECS["json"])
+
+def json_codec():
+    """Fastest installed codec that produces plain JSON (readable by every JSON codec)."""
+    return _CODECS.get("orjson", _CODECS["json"])
+
+# -----------------------
+# File helpers
+# -----------------------
+def iter_file(path: str | os.PathLike, codec=None) -> Iterator[Any]:
+    """Stream records from a file written with write_stream/append."""
+    codec = codec or get_codec()
+    with open(path, "rb") as f:
+        yield from codec.read_stream(f)
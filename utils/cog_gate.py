@@ -0,0 +1,192 @@
+"""Per-guild cog enable/disable, enforced where events and commands are dispatched.
+
+Every cog name gets a bit; each guild's ``disabled_cogs`` list is folded into one
+integer mask that stays in memory until the guild's config changes. A disabled
+cog's listeners return before calling into the cog, and its commands fail the
+global check, so a guild that turns a cog off no longer pays for it.
+"""
+import asyncio
+import functools
+import logging
+import time
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils import tracing
+from utils.breaker import breaker_for
+from utils.logging_setup import log_context
+from utils.metrics import LISTENER_SECONDS, LISTENER_SHED, LISTENER_SKIPPED, mark_app_command_start, observe_app_command
+from utils.storage import get_guild_config, subscribe
+
+log = logging.getLogger("CM-V5.4")
+
+_bits: dict[str, int] = {}    # cog name -> bit
+_masks: dict[int, int] = {}   # guild id -> mask of disabled cog bits
+
+def cog_bit(cog_name: str) -> int:
+    bit = _bits.get(cog_name)
+    if bit is None:
+        bit = _bits[cog_name] = 1 << len(_bits)
+    return bit
+
+def disabled_mask(guild_id: int) -> int:
+    mask = _masks.get(guild_id)
+    if mask is None:
+        mask = 0
+        for name in get_guild_config(guild_id).get("disabled_cogs", ()):
+            mask |= cog_bit(name)
+        _masks[guild_id] = mask
+    return mask
+
+def is_cog_disabled(guild_id: int, cog_name: str) -> bool:
+    return bool(disabled_mask(guild_id) & cog_bit(cog_name))
+
+def _invalidate(guild_id: int):
+    _masks.pop(guild_id, None)
+
+subscribe(_invalidate)
+
+# -----------------------
+# Listeners
+# -----------------------
+_NESTED = ("message", "channel", "thread")   # e.g. Reaction.message, Invite.channel
+
+def _guild_id_of(obj, nested: bool = True) -> int | None:
+    if isinstance(obj, discord.Guild):
+        return obj.id
+    guild = getattr(obj, "guild", None)
+    if guild is not None:
+        return getattr(guild, "id", None)
+    guild_id = getattr(obj, "guild_id", None)
+    if guild_id is not None:
+        return guild_id
+    if nested:
+        for attr in _NESTED:
+            inner = getattr(obj, attr, None)
+            if inner is not None:
+                guild_id = _guild_id_of(inner, nested=False)
+                if guild_id is not None:
+                    return guild_id
+    return None
+
+def _event_guild_id(args: tuple) -> int | None:
+    """Guild id of an event from its arguments (message, member, channel, guild, raw payload,
+    a list of messages, an object holding one of those...)."""
+    for arg in args:
+        # Sequences (on_bulk_message_delete) hold objects of a single guild
+        if isinstance(arg, (list, tuple)):
+            arg = arg[0] if arg else None
+        guild_id = _guild_id_of(arg)
+        if guild_id is not None:
+            return guild_id
+    return None
+
+def _late_result(cog_name: str, name: str):
+    def done(task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            log.error(f"{cog_name}.{name} failed after its timeout: {task.exception()!r}")
+    return done
+
+def _gated(cog_name: str, func):
+    bit = cog_bit(cog_name)
+    name = func.__name__
+    span_name = f"{cog_name}.{name}"
+    breaker = breaker_for(cog_name)
+
+    @functools.wraps(func)
+    async def listener(*args, **kwargs):
+        guild_id = _event_guild_id(args)
+        if guild_id is not None and disabled_mask(guild_id) & bit:
+            LISTENER_SKIPPED.inc(cog_name)
+            return
+        if not breaker.allow():
+            LISTENER_SHED.inc(cog_name)
+            return
+        start = time.perf_counter()
+        failed = False
+        context = log_context.set((guild_id, cog_name))
+        try:
+            with tracing.span(span_name, "listener"):
+                if breaker.timeout is None:
+                    return await func(*args, **kwargs)
+                # Past the timeout the call counts as failed and the dispatcher stops
+                # waiting, but it is not cancelled: a half-done send/delete finishes
+                task = asyncio.ensure_future(func(*args, **kwargs))
+                done, _ = await asyncio.wait((task,), timeout=breaker.timeout)
+                if not done:
+                    failed = True
+                    task.add_done_callback(_late_result(cog_name, name))
+                    log.warning(f"{span_name} still running after {breaker.timeout:.0f}s; no longer waiting on it")
+                    return None
+                return task.result()
+        except Exception:
+            failed = True
+            raise
+        finally:
+            log_context.reset(context)
+            elapsed = time.perf_counter() - start
+            LISTENER_SECONDS.observe(elapsed, cog_name, name)
+            breaker.record(elapsed, failed)
+
+    listener.__cog_gated__ = True
+    return listener
+
+def gate_listeners(cog: commands.Cog):
+    """Replace the cog's listener methods (on the instance) with gated, timed wrappers
+    that also enforce the cog's latency/error budget (utils.breaker).
+
+    Cog._inject / _eject look the methods up on the instance, so the wrappers are
+    both registered and removed again on unload.
+    """
+    for _, method_name in cog.__cog_listeners__:
+        method = getattr(cog, method_name)
+        if not getattr(method, "__cog_gated__", False):
+            setattr(cog, method_name, _gated(cog.qualified_name, method))
+
+# -----------------------
+# Commands
+# -----------------------
+class CogDisabled(commands.CheckFailure):
+    """Raised for commands of a cog that is disabled in the invoking guild."""
+
+class GatedCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        mark_app_command_start(interaction)
+        command = interaction.command
+        cog = getattr(command, "binding", None)
+        if interaction.guild_id and isinstance(cog, commands.Cog) \
+                and is_cog_disabled(interaction.guild_id, cog.qualified_name):
+            await interaction.response.send_message(
+                f"⛔ `{cog.qualified_name}` is disabled on this server.", ephemeral=True
+            )
+            return False
+        return True
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
+        observe_app_command(interaction, "error")
+        await super().on_error(interaction, error)
+
+class CogGateMixin:
+    """Bot mixin: gates every added cog and checks prefix/hybrid commands."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("tree_cls", GatedCommandTree)
+        super().__init__(*args, **kwargs)
+        self.add_check(self._cog_enabled)
+
+    @staticmethod
+    async def _cog_enabled(ctx: commands.Context) -> bool:
+        if ctx.guild and ctx.cog and is_cog_disabled(ctx.guild.id, ctx.cog.qualified_name):
+            raise CogDisabled(f"{ctx.cog.qualified_name} is disabled in this guild")
+        return True
+
+    async def add_cog(self, cog: commands.Cog, /, **kwargs):
+        gate_listeners(cog)
+        await super().add_cog(cog, **kwargs)
+
+    async def on_command_error(self, ctx: commands.Context, error: commands.CommandError):
+        if isinstance(error, CogDisabled):
+            return
+        await super().on_command_error(ctx, error)
@@ -0,0 +1,54 @@
+"""Removal of the per-guild command copies uploaded by earlier versions.
+
+Every application command is global (see utils.startup.sync_if_changed), and
+the live command tree is never edited to build a sync payload. Discord gives a
+bot no way to hide a global command in a single guild: per-guild command
+permission overrides can only be written with a member's OAuth2 token, not the
+bot token. Commands of a cog that a guild disabled therefore stay listed there,
+and the cog gate (utils.cog_gate) answers them with the "disabled" notice
+instead of running them.
+
+Earlier versions uploaded the commands of toggleable cogs per guild and kept
+the payload hash under ``command_tree_hash:<guild_id>`` in the meta table. Those
+guild copies would now be listed next to the global commands, so every guild
+that still has such a hash gets one empty guild sync, at SYNC_RATE, after which
+the hash is dropped.
+"""
+import asyncio
+import logging
+
+import discord
+from discord.ext import commands
+
+from utils import database, persistence
+from utils.startup import TREE_HASH_KEY, RateLimiter, payload_hash
+
+log = logging.getLogger("CM-V5.4")
+
+SYNC_RATE = 0.5   # guild syncs per second
+
+EMPTY_HASH = payload_hash([])
+GUILD_HASH_PREFIX = f"{TREE_HASH_KEY}:"
+
+async def clear_guild_copies(bot: commands.Bot, rate: float = SYNC_RATE) -> int:
+    """Delete leftover guild commands in this process's guilds. Returns how many guilds were synced."""
+    stored = await persistence.run(database.meta_with_prefix, GUILD_HASH_PREFIX)
+    limiter = RateLimiter(rate)
+    cleared = 0
+    for key, digest in stored.items():
+        guild_id = int(key[len(GUILD_HASH_PREFIX):])
+        if bot.get_guild(guild_id) is None:
+            continue   # another cluster's guild, or one the bot left
+        if digest != EMPTY_HASH:
+            await limiter.wait()
+            try:
+                # Nothing is registered for the guild locally, so this uploads an empty list
+                await bot.tree.sync(guild=discord.Object(id=guild_id))
+                cleared += 1
+            except discord.HTTPException as e:
+                log.warning(f"Clearing guild commands of {guild_id} failed: {e}")
+                continue
+        await persistence.run(database.delete_meta, key)
+    if cleared:
+        log.info(f"Removed per-guild command copies from {cleared} guilds")
+    return cleared
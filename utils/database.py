@@ -0,0 +1,264 @@
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from utils import persistence
+from utils.codec import json_codec
+
+# Single SQLite file holding every piece of persistent bot state
+DB_PATH = Path(os.getenv("DATABASE_PATH", "data/cmv5.db"))
+
+# Settings namespace of the per-guild config document (utils.storage)
+NS_GUILD = "guild"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS settings (
+    guild_id   INTEGER NOT NULL,
+    namespace  TEXT    NOT NULL,
+    data       TEXT    NOT NULL,
+    updated_at REAL    NOT NULL,
+    PRIMARY KEY (guild_id, namespace)
+);
+CREATE INDEX IF NOT EXISTS idx_settings_namespace ON settings (namespace);
+CREATE TABLE IF NOT EXISTS levels (
+    guild_id INTEGER NOT NULL,
+    user_id  INTEGER NOT NULL,
+    xp       INTEGER NOT NULL DEFAULT 0,
+    level    INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS idx_levels_guild_xp ON levels (guild_id, xp DESC);
+CREATE TABLE IF NOT EXISTS selector_roles (
+    guild_id INTEGER NOT NULL,
+    role_id  INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (guild_id, role_id)
+);
+CREATE INDEX IF NOT EXISTS idx_selector_roles_guild ON selector_roles (guild_id, position);
+CREATE TABLE IF NOT EXISTS reminders (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id   INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    hour       INTEGER NOT NULL,
+    minute     INTEGER NOT NULL,
+    title      TEXT    NOT NULL,
+    message    TEXT    NOT NULL,
+    last_sent  TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_reminders_time ON reminders (hour, minute);
+CREATE INDEX IF NOT EXISTS idx_reminders_guild ON reminders (guild_id);
+"""
+
+# -----------------------
+# Statements
+# -----------------------
+# Kept as constants so sqlite3's statement cache reuses the compiled plans.
+SQL_GET_SETTINGS = "SELECT data FROM settings WHERE guild_id = ? AND namespace = ?"
+SQL_ALL_SETTINGS = "SELECT guild_id, data FROM settings WHERE namespace = ?"
+SQL_PUT_SETTINGS = (
+    "INSERT INTO settings (guild_id, namespace, data, updated_at) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (guild_id, namespace) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at"
+)
+SQL_DELETE_NAMESPACE = "DELETE FROM settings WHERE namespace = ?"
+SQL_ALL_LEVELS = "SELECT guild_id, user_id, xp, level FROM levels"
+SQL_PUT_LEVEL = (
+    "INSERT INTO levels (guild_id, user_id, xp, level) VALUES (?, ?, ?, ?) "
+    "ON CONFLICT (guild_id, user_id) DO UPDATE SET xp = excluded.xp, level = excluded.level"
+)
+SQL_GET_SELECTOR_ROLES = "SELECT role_id FROM selector_roles WHERE guild_id = ? ORDER BY position"
+SQL_ALL_SELECTOR_ROLES = "SELECT guild_id, role_id FROM selector_roles ORDER BY guild_id, position"
+SQL_ADD_SELECTOR_ROLE = (
+    "INSERT OR IGNORE INTO selector_roles (guild_id, role_id, position) "
+    "VALUES (?, ?, (SELECT COALESCE(MAX(position), -1) + 1 FROM selector_roles WHERE guild_id = ?))"
+)
+SQL_REMOVE_SELECTOR_ROLE = "DELETE FROM selector_roles WHERE guild_id = ? AND role_id = ?"
+SQL_ADD_REMINDER = (
+    "INSERT INTO reminders (guild_id, channel_id, hour, minute, title, message, last_sent) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+# Same insert, skipped when an identical reminder already exists (re-running the JSON import)
+SQL_ADD_REMINDER_ONCE = (
+    "INSERT INTO reminders (guild_id, channel_id, hour, minute, title, message, last_sent) "
+    "SELECT ?, ?, ?, ?, ?, ?, ? WHERE NOT EXISTS ("
+    "SELECT 1 FROM reminders WHERE guild_id = ? AND channel_id = ? AND hour = ? AND minute = ? AND title = ?)"
+)
+SQL_DUE_REMINDERS = (
+    "SELECT id, guild_id, channel_id, hour, minute, title, message, last_sent "
+    "FROM reminders WHERE hour = ? AND minute = ?"
+)
+SQL_MARK_REMINDER = "UPDATE reminders SET last_sent = ? WHERE id = ?"
+SQL_GET_META = "SELECT value FROM meta WHERE key = ?"
+SQL_PUT_META = "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)"
+SQL_DELETE_META = "DELETE FROM meta WHERE key = ?"
+SQL_META_PREFIX = "SELECT key, value FROM meta WHERE substr(key, 1, length(?)) = ?"
+
+# Settings documents are stored as JSON text; orjson is used when installed
+_json = json_codec()
+
+_conn: sqlite3.Connection | None = None
+_lock = threading.RLock()
+
+def get_connection() -> sqlite3.Connection:
+    """Open (once) the shared WAL-mode connection and make sure the schema exists."""
+    global _conn
+    if _conn is None:
+        with _lock:
+            if _conn is None:
+                DB_PATH.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=128)
+                conn.row_factory = sqlite3.Row
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(SCHEMA)
+                _conn = conn
+    return _conn
+
+def close():
+    """Checkpoint the WAL and close the connection."""
+    global _conn
+    with _lock:
+        if _conn is not None:
+            _conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            _conn.close()
+            _conn = None
+
+# Close only after every queued write has been persisted
+persistence.on_close(close)
+
+def _execute(sql: str, params: tuple = ()) -> sqlite3.Cursor:
+    conn = get_connection()
+    with _lock, conn:
+        return conn.execute(sql, params)
+
+def _query(sql: str, params: tuple = ()) -> list[sqlite3.Row]:
+    conn = get_connection()
+    with _lock:
+        return conn.execute(sql, params).fetchall()
+
+# -----------------------
+# Meta
+# -----------------------
+def get_meta(key: str) -> str | None:
+    rows = _query(SQL_GET_META, (key,))
+    return rows[0]["value"] if rows else None
+
+def set_meta(key: str, value: str):
+    _execute(SQL_PUT_META, (key, value))
+
+def delete_meta(key: str):
+    _execute(SQL_DELETE_META, (key,))
+
+def meta_with_prefix(prefix: str) -> dict[str, str]:
+    """Every meta entry whose key starts with prefix."""
+    return {row["key"]: row["value"] for row in _query(SQL_META_PREFIX, (prefix, prefix))}
+
+# -----------------------
+# Settings
+# -----------------------
+def load_settings(guild_id: int, namespace: str = NS_GUILD) -> dict | None:
+    """Return the settings document for a guild, or None if it was never saved."""
+    rows = _query(SQL_GET_SETTINGS, (guild_id, namespace))
+    return _json.loads(rows[0]["data"]) if rows else None
+
+def load_settings_many(guild_ids: list[int], namespace: str = NS_GUILD, chunk: int = 500) -> dict[int, dict]:
+    """Return the settings documents of these guilds (guilds never saved are left out)."""
+    found = {}
+    for i in range(0, len(guild_ids), chunk):
+        ids = guild_ids[i:i + chunk]
+        sql = (f"SELECT guild_id, data FROM settings WHERE namespace = ? "
+               f"AND guild_id IN ({','.join('?' * len(ids))})")
+        for row in _query(sql, (namespace, *ids)):
+            found[row["guild_id"]] = _json.loads(row["data"])
+    return found
+
+def load_all_settings(namespace: str) -> dict[int, dict]:
+    """Return every guild's settings document in a namespace."""
+    return {row["guild_id"]: _json.loads(row["data"]) for row in _query(SQL_ALL_SETTINGS, (namespace,))}
+
+def save_settings(guild_id: int, data: dict, namespace: str = NS_GUILD):
+    """Upsert a guild's settings document."""
+    _execute(SQL_PUT_SETTINGS, (guild_id, namespace, _json.dumps(data).decode("utf-8"), time.time()))
+
+def delete_namespace(namespace: str):
+    """Remove every settings row in a namespace."""
+    _execute(SQL_DELETE_NAMESPACE, (namespace,))
+
+# -----------------------
+# Levels
+# -----------------------
+def load_levels() -> dict[int, dict[int, tuple[int, int]]]:
+    """Return {guild_id: {user_id: (xp, level)}} for every tracked member."""
+    levels: dict[int, dict[int, tuple[int, int]]] = {}
+    for row in _query(SQL_ALL_LEVELS):
+        levels.setdefault(row["guild_id"], {})[row["user_id"]] = (row["xp"], row["level"])
+    return levels
+
+def iter_levels(batch_size: int = 5000):
+    """Yield (guild_id, user_id, xp, level) rows in batches, without loading the whole table."""
+    conn = get_connection()
+    cursor = conn.cursor()
+    with _lock:
+        cursor.execute(SQL_ALL_LEVELS)
+        rows = cursor.fetchmany(batch_size)
+    while rows:
+        for row in rows:
+            yield tuple(row)
+        with _lock:
+            rows = cursor.fetchmany(batch_size)
+
+def save_level(guild_id: int, user_id: int, xp: int, level: int):
+    """Upsert a single member's XP row."""
+    _execute(SQL_PUT_LEVEL, (guild_id, user_id, xp, level))
+
+def save_levels(rows: list[tuple[int, int, int, int]]):
+    """Upsert many (guild_id, user_id, xp, level) rows in one transaction."""
+    conn = get_connection()
+    with _lock, conn:
+        conn.executemany(SQL_PUT_LEVEL, rows)
+
+# -----------------------
+# Selector roles
+# -----------------------
+def load_selector_roles(guild_id: int) -> list[int]:
+    return [row["role_id"] for row in _query(SQL_GET_SELECTOR_ROLES, (guild_id,))]
+
+def load_all_selector_roles() -> dict[int, list[int]]:
+    """Return {guild_id: [role_id, ...]} for every guild with a role selector."""
+    roles: dict[int, list[int]] = {}
+    for row in _query(SQL_ALL_SELECTOR_ROLES):
+        roles.setdefault(row["guild_id"], []).append(row["role_id"])
+    return roles
+
+def add_selector_role(guild_id: int, role_id: int):
+    _execute(SQL_ADD_SELECTOR_ROLE, (guild_id, role_id, guild_id))
+
+def remove_selector_role(guild_id: int, role_id: int):
+    _execute(SQL_REMOVE_SELECTOR_ROLE, (guild_id, role_id))
+
+# -----------------------
+# Reminders
+# -----------------------
+def add_reminder(guild_id: int, channel_id: int, hour: int, minute: int, title: str, message: str,
+                 last_sent: str | None = None) -> int:
+    cur = _execute(SQL_ADD_REMINDER, (guild_id, channel_id, hour, minute, title, message, last_sent))
+    return cur.lastrowid
+
+def add_reminder_once(guild_id: int, channel_id: int, hour: int, minute: int, title: str, message: str,
+                      last_sent: str | None = None) -> bool:
+    """Insert unless a reminder with the same guild, channel, time and title exists. True if inserted."""
+    cur = _execute(SQL_ADD_REMINDER_ONCE, (guild_id, channel_id, hour, minute, title, message, last_sent,
+                                           guild_id, channel_id, hour, minute, title))
+    return cur.rowcount > 0
+
+def load_due_reminders(hour: int, minute: int) -> list[dict]:
+    """Return reminders scheduled for the given UTC time (uses the time index)."""
+    return [dict(row) for row in _query(SQL_DUE_REMINDERS, (hour, minute))]
+
+def mark_reminder_sent(reminder_id: int, day: str):
+    _execute(SQL_MARK_REMINDER, (day, reminder_id))
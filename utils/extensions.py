@@ -0,0 +1,49 @@
+"""Concurrent cog loading with a per-extension timing report.
+
+Every extension is loaded with ``bot.load_extension``, which imports the module
+(on the event loop) and runs its setup. Cogs keep module bodies cheap (heavy
+dependencies such as requests are imported inside the commands that use them)
+and do their blocking setup in ``cog_load`` through the persistence pool, so
+the loads overlap on those awaits.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+
+from discord.ext import commands
+
+log = logging.getLogger("CM-V5.4")
+
+
+@dataclass
+class ExtensionTiming:
+    name: str
+    load_ms: float = 0.0   # import + setup + cog_load, as load_extension runs them
+    error: str | None = None
+
+
+async def _load_one(bot: commands.Bot, name: str) -> ExtensionTiming:
+    timing = ExtensionTiming(name)
+    module = f"cogs.{name}"
+    start = time.perf_counter()
+    try:
+        await bot.load_extension(module)
+    except Exception as e:
+        timing.error = str(e)
+    timing.load_ms = (time.perf_counter() - start) * 1000
+    return timing
+
+async def load_extensions(bot: commands.Bot, names: list[str]) -> list[ExtensionTiming]:
+    """Load every extension concurrently; a failing one does not stop the others."""
+    return list(await asyncio.gather(*(_load_one(bot, name) for name in names)))
+
+def format_report(timings: list[ExtensionTiming], wall_ms: float) -> str:
+    lines = [f"{'cog':<18}{'load ms':>10}  status"]
+    for t in sorted(timings, key=lambda t: t.load_ms, reverse=True):
+        status = "ok" if t.error is None else f"FAILED: {t.error}"
+        lines.append(f"{t.name:<18}{t.load_ms:>10.1f}  {status}")
+    loaded = sum(t.error is None for t in timings)
+    lines.append(f"{loaded}/{len(timings)} cogs loaded in {wall_ms:.1f} ms "
+                 f"(sum of per-cog time {sum(t.load_ms for t in timings):.1f} ms)")
+    return "\n".join(lines)
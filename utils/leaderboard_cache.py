@@ -0,0 +1,76 @@
+"""Rendered leaderboard pages, cached per guild and page.
+
+A page stays cached until someone on it changes position (see
+RankIndex.update, which reports the range of ranks that moved) or its TTL
+runs out; the TTL bounds how stale the XP numbers and member names on an
+otherwise unchanged page can get.
+
+Environment:
+    LEADERBOARD_TTL   seconds a rendered page is reused (default 30)
+"""
+import os
+import time
+
+TTL = float(os.getenv("LEADERBOARD_TTL", "30"))
+PER_PAGE = 10
+SWEEP_AT = 5000   # cached pages before expired ones are swept
+
+class LeaderboardCache:
+    def __init__(self, ttl: float = TTL, per_page: int = PER_PAGE):
+        self.ttl = ttl
+        self.per_page = per_page
+        self._pages: dict[int, dict[int, tuple[float, str]]] = {}   # guild -> page -> (expires, text)
+        self._count = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get(self, guild_id: int, page: int) -> str | None:
+        entry = self._pages.get(guild_id, {}).get(page)
+        if entry is None or entry[0] <= time.monotonic():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def put(self, guild_id: int, page: int, text: str):
+        pages = self._pages.setdefault(guild_id, {})
+        if page not in pages:
+            self._count += 1
+        pages[page] = (time.monotonic() + self.ttl, text)
+        if self._count > SWEEP_AT:
+            self._sweep()
+
+    def invalidate(self, guild_id: int, first: int | None = None, last: int | None = None):
+        """Drop the pages showing ranks first..last (1-based), or every page of the guild."""
+        pages = self._pages.get(guild_id)
+        if not pages:
+            return
+        if first is None:
+            self._count -= len(pages)
+            del self._pages[guild_id]
+            return
+        first_page = (first - 1) // self.per_page + 1
+        last_page = (last - 1) // self.per_page + 1 if last is not None else max(pages)
+        # Walk the few cached pages, not every page number a long rank range covers
+        for page in [p for p in pages if first_page <= p <= last_page]:
+            del pages[page]
+            self._count -= 1
+        if not pages:
+            del self._pages[guild_id]
+
+    def clear(self):
+        self._pages.clear()
+        self._count = 0
+
+    def _sweep(self):
+        now = time.monotonic()
+        for guild_id in list(self._pages):
+            pages = self._pages[guild_id]
+            for page in [p for p, (expires, _) in pages.items() if expires <= now]:
+                del pages[page]
+                self._count -= 1
+            if not pages:
+                del self._pages[guild_id]
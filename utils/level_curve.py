@@ -0,0 +1,83 @@
+"""XP level curves with a cumulative threshold table.
+
+Going from level n to n + 1 costs int(base * (n + 1) ** exponent) XP; the
+default (base 100, exponent 1.5) is the original curve. Each curve keeps the
+total XP needed to reach every level in one list, extended lazily as members
+reach higher levels, so turning XP into a level is a single bisect instead of
+walking the curve step by step.
+
+Guilds can pick their own base/exponent (config section "leveling"); curves
+are shared between every guild using the same parameters. Guild parameters are
+held to at least MIN_BASE / MIN_EXPONENT, and every table stops at MAX_LEVEL,
+so a flat curve (one XP per level) can't grow a table entry per XP point.
+"""
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Iterable
+
+DEFAULT_BASE = 100
+DEFAULT_EXPONENT = 1.5
+MIN_BASE = 10
+MIN_EXPONENT = 1.0
+MAX_LEVEL = 10_000   # beyond reach on any allowed curve (base 10, exponent 1: 5 * 10^8 XP)
+
+class LevelCurve:
+    def __init__(self, base: float = DEFAULT_BASE, exponent: float = DEFAULT_EXPONENT):
+        if base <= 0 or exponent < 0:
+            raise ValueError("base must be positive and exponent non-negative")
+        self.base = base
+        self.exponent = exponent
+        self._totals = [0]   # _totals[n] = XP needed to reach level n
+
+    def cost(self, level: int) -> int:
+        """XP needed to go from `level` to `level + 1` (at least 1)."""
+        return max(1, int(self.base * (level + 1) ** self.exponent))
+
+    def _extend_to_xp(self, xp: int):
+        # Keep one threshold above xp so bisect never runs off the end; the table
+        # ends at MAX_LEVEL + 1 whatever the XP
+        totals = self._totals
+        while totals[-1] <= xp and len(totals) <= MAX_LEVEL + 1:
+            totals.append(totals[-1] + self.cost(len(totals) - 1))
+
+    def threshold(self, level: int) -> int:
+        """Total XP needed to reach `level` (capped at MAX_LEVEL + 1)."""
+        level = min(level, MAX_LEVEL + 1)
+        totals = self._totals
+        while len(totals) <= level:
+            totals.append(totals[-1] + self.cost(len(totals) - 1))
+        return totals[level]
+
+    def level_for(self, xp: int) -> int:
+        self._extend_to_xp(xp)
+        return min(bisect_right(self._totals, xp) - 1, MAX_LEVEL)
+
+    def progress(self, xp: int) -> tuple[int, int, int]:
+        """(level, XP earned within that level, XP the level costs) for a progress bar."""
+        level = self.level_for(xp)
+        start = self.threshold(level)
+        needed = self.threshold(level + 1) - start
+        return level, min(xp - start, needed), needed
+
+    def levels_for(self, xps: Iterable[int]) -> list[int]:
+        """Levels of many members at once (leaderboards); the table is extended only once."""
+        xps = list(xps)
+        if not xps:
+            return []
+        self._extend_to_xp(max(xps))
+        totals = self._totals
+        return [min(bisect_right(totals, xp) - 1, MAX_LEVEL) for xp in xps]
+
+@lru_cache(maxsize=64)
+def get_curve(base: float = DEFAULT_BASE, exponent: float = DEFAULT_EXPONENT) -> LevelCurve:
+    """Shared curve instance for these parameters."""
+    return LevelCurve(base, exponent)
+
+def curve_for_config(config) -> LevelCurve:
+    """Curve of a guild config snapshot (see utils.storage.get_guild_config)."""
+    leveling = config["leveling"]
+    return get_curve(max(MIN_BASE, leveling["curve_base"]), max(MIN_EXPONENT, leveling["curve_exponent"]))
+
+def progress_bar(done: int, total: int, length: int = 20) -> str:
+    filled = min(length, int(length * done / total)) if total else length
+    return "🟩" * filled + "⬛" * (length - filled)
@@ -0,0 +1,160 @@
+"""Non-blocking structured logging.
+
+Records are put on an in-memory queue by a QueueHandler; a QueueListener thread
+formats them and does the I/O, so logging never waits on stderr or disk from the
+event loop. Every record carries the guild and cog of the listener that logged
+it (set by utils.cog_gate), unless passed explicitly with extra={"guild": ...}.
+
+Environment:
+    LOG_FORMAT   json (default) or text
+    LOG_LEVEL    root level (default INFO)
+    LOG_LEVELS   per logger, e.g. "cogs.security=DEBUG,cogs.leveling=WARNING"
+                 (names are relative to the CM-V5.4 logger)
+    LOG_FILE     also write to this file, rotated at 10 MiB (default: off)
+    LOG_REPEAT_LIMIT  identical messages allowed per minute before they are
+                 suppressed and summarised (default 5)
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+ROOT = "CM-V5.4"
+REPEAT_WINDOW = 60.0
+
+# (guild_id, cog_name) of the listener currently running in this task
+log_context: contextvars.ContextVar[tuple[int | None, str | None]] = contextvars.ContextVar(
+    "log_context", default=(None, None)
+)
+
+class ContextFilter(logging.Filter):
+    """Adds record.guild / record.cog from the running listener."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        guild, cog = log_context.get()
+        if not hasattr(record, "guild"):
+            record.guild = guild
+        if not hasattr(record, "cog"):
+            record.cog = cog
+        return True
+
+class RepeatFilter(logging.Filter):
+    """Lets the same message through `limit` times per window, then counts the rest.
+
+    The next record of that message after the window says how many were suppressed.
+    """
+
+    def __init__(self, limit: int = 5, window: float = REPEAT_WINDOW):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._seen: dict[tuple, list] = {}   # key -> [window start, count]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = (record.name, record.levelno, record.msg)
+        now = time.monotonic()
+        entry = self._seen.get(key)
+        if entry is None or now - entry[0] >= self.window:
+            suppressed = max(0, entry[1] - self.limit) if entry else 0
+            self._seen[key] = [now, 1]
+            if suppressed:
+                record.suppressed = suppressed
+            if len(self._seen) > 10_000:
+                self._seen = {k: v for k, v in self._seen.items() if now - v[0] < self.window}
+            return True
+        entry[1] += 1
+        return entry[1] <= self.limit
+
+class LoopSafeQueueHandler(logging.handlers.QueueHandler):
+    """Only merges the message arguments on the calling thread; formatting happens in the listener."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "guild": getattr(record, "guild", None),
+            "cog": getattr(record, "cog", None),
+        }
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s%(where)s: %(message)s%(repeats)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        parts = [p for p in (getattr(record, "cog", None), getattr(record, "guild", None)) if p]
+        record.where = f" [{' '.join(map(str, parts))}]" if parts else ""
+        suppressed = getattr(record, "suppressed", 0)
+        record.repeats = f" (+{suppressed} suppressed)" if suppressed else ""
+        return super().format(record)
+
+_listener: logging.handlers.QueueListener | None = None
+_queue_handler: logging.Handler | None = None
+
+def setup_logging():
+    """Install the queue-based pipeline on the root logger (idempotent)."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    formatter = TextFormatter() if os.getenv("LOG_FORMAT", "json") == "text" else JsonFormatter()
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if log_file := os.getenv("LOG_FILE"):
+        handlers.append(logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=10 * 2**20, backupCount=3, encoding="utf-8"
+        ))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = LoopSafeQueueHandler(log_queue)
+    queue_handler.addFilter(ContextFilter())
+    queue_handler.addFilter(RepeatFilter(int(os.getenv("LOG_REPEAT_LIMIT", "5"))))
+
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(queue_handler)
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+    for item in os.getenv("LOG_LEVELS", "").split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            logging.getLogger(f"{ROOT}.{name.strip()}").setLevel(level.strip().upper())
+
+    _queue_handler = queue_handler
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+def stop_logging():
+    """Write out everything still queued, then log synchronously (later exit hooks still log)."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    root = logging.getLogger()
+    root.removeHandler(_queue_handler)
+    for handler in _listener.handlers:
+        for f in _queue_handler.filters:
+            handler.addFilter(f)
+        root.addHandler(handler)
+    _listener = None
@@ -0,0 +1,280 @@
+"""Process metrics in the Prometheus text format, plus health/readiness routes.
+
+    GET /metrics   all metrics below
+    GET /healthz   200 while the event loop is serving requests
+    GET /readyz    200 once the gateway session is ready, 503 otherwise
+
+Listener timings come from the listener wrappers in utils.cog_gate, command
+timings and event counts from MetricsMixin, REST calls from an aiohttp trace
+hooked into discord.py's HTTP client. Cogs can expose the size of their
+in-memory structures with ``memory_stats() -> {name: entries}``.
+"""
+import bisect
+import logging
+import re
+import time
+from typing import Callable, Iterable
+
+import aiohttp
+from aiohttp import web
+import discord
+from discord.ext import commands
+
+from utils import breaker, storage, tracing
+
+log = logging.getLogger("CM-V5.4")
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: list = []
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+# -----------------------
+# Metric types
+# -----------------------
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values: dict[tuple, float] = {}
+        _registry.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for labels, value in self._values.items():
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+class GaugeFunc:
+    """Gauge whose samples are read at scrape time: func() -> [(labels, value), ...]."""
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple, func: Callable[[], Iterable[tuple]]):
+        self.name, self.help, self.labelnames, self.func = name, help, labelnames, func
+        _registry.append(self)
+
+    def samples(self) -> Iterable[str]:
+        try:
+            values = list(self.func())
+        except Exception as e:
+            log.warning(f"Collecting {self.name} failed: {e}")
+            return
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.labelnames, labels)} {value}"
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name, self.help, self.labelnames, self.buckets = name, help, labelnames, buckets
+        self._series: dict[tuple, list] = {}   # labels -> [bucket counts..., +Inf count, sum]
+        _registry.append(self)
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        for labels, series in self._series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                le = f'le="{bound}"'
+                yield f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, labels)} {series[-1]}"
+            yield f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}"
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+# -----------------------
+# Bot metrics
+# -----------------------
+EVENTS = Counter("discord_events_total", "Gateway events dispatched", ("event",))
+LISTENER_SECONDS = Histogram("cog_listener_duration_seconds", "Cog listener run time", ("cog", "listener"))
+LISTENER_SHED = Counter("cog_listener_shed_total", "Listener calls shed by an open circuit breaker", ("cog",))
+LISTENER_SKIPPED = Counter("cog_listener_skipped_total", "Listener calls skipped for guilds that disabled the cog", ("cog",))
+COMMAND_SECONDS = Histogram("command_duration_seconds", "Command run time", ("command", "kind", "status"))
+REST_REQUESTS = Counter("discord_rest_requests_total", "Discord REST requests", ("method", "route", "status"))
+REST_SECONDS = Histogram("discord_rest_duration_seconds", "Discord REST request time", ("method", "route"))
+REST_RATE_LIMITED = Counter("discord_rest_ratelimited_total", "Discord REST responses with status 429", ("method", "route"))
+
+_bot: commands.Bot | None = None
+
+def _bot_gauge(read: Callable[[commands.Bot], float]):
+    def collect():
+        if _bot is not None:
+            yield (), read(_bot)
+    return collect
+
+def _structure_sizes():
+    if _bot is not None:
+        for cog in list(_bot.cogs.values()):
+            if hasattr(cog, "memory_stats"):
+                for name, size in cog.memory_stats().items():
+                    yield (cog.qualified_name, name), size
+    yield ("storage", "settings_cache"), storage.get_cache_stats()["cached"]
+
+def _breaker_states():
+    for b in breaker.all_breakers():
+        yield (b.cog_name,), {breaker.CLOSED: 0, breaker.HALF_OPEN: 1, breaker.OPEN: 2}[b.state]
+
+GaugeFunc("cog_breaker_state", "Circuit breaker per cog: 0 closed, 1 half-open, 2 open", ("cog",), _breaker_states)
+GaugeFunc("discord_gateway_latency_seconds", "Gateway heartbeat latency",
+          (), _bot_gauge(lambda bot: bot.latency if bot.latency == bot.latency else 0))   # NaN before connect
+GaugeFunc("discord_guilds", "Guilds in the cache", (), _bot_gauge(lambda bot: len(bot.guilds)))
+GaugeFunc("discord_cached_users", "Users in the cache", (), _bot_gauge(lambda bot: len(bot.users)))
+GaugeFunc("discord_cached_messages", "Messages in the message cache", (), _bot_gauge(lambda bot: len(bot.cached_messages)))
+GaugeFunc("memory_structure_entries", "Entries held in in-memory structures", ("owner", "structure"), _structure_sizes)
+
+# -----------------------
+# REST tracing
+# -----------------------
+_SNOWFLAKE = re.compile(r"^\d{15,21}$")
+
+def normalize_route(path: str) -> str:
+    """/api/v10/channels/123/messages/456 -> /channels/{id}/messages/{id}"""
+    parts = path.split("/")
+    if len(parts) > 2 and parts[1] == "api" and parts[2].startswith("v"):
+        parts = [""] + parts[3:]
+    out = []
+    for i, part in enumerate(parts):
+        if _SNOWFLAKE.match(part):
+            out.append("{id}")
+        elif i and parts[i - 1] == "reactions" and part:
+            out.append("{emoji}")
+        elif len(part) >= 32:
+            out.append("{token}")   # webhook / interaction tokens
+        else:
+            out.append(part)
+    return "/".join(out)
+
+def trace_config() -> aiohttp.TraceConfig:
+    """aiohttp trace for discord.py's HTTP client (passed as http_trace=)."""
+    trace = aiohttp.TraceConfig()
+
+    async def on_start(session, ctx, params):
+        ctx.started = time.perf_counter()
+        ctx.wall = time.time()
+
+    async def on_end(session, ctx, params):
+        route = normalize_route(params.url.path)
+        status = params.response.status
+        seconds = time.perf_counter() - ctx.started
+        REST_REQUESTS.inc(params.method, route, status)
+        REST_SECONDS.observe(seconds, params.method, route)
+        tracing.record_rest(params.method, route, status, ctx.wall, seconds)
+        if status == 429:
+            REST_RATE_LIMITED.inc(params.method, route)
+
+    async def on_exception(session, ctx, params):
+        REST_REQUESTS.inc(params.method, normalize_route(params.url.path), "error")
+
+    trace.on_request_start.append(on_start)
+    trace.on_request_end.append(on_end)
+    trace.on_request_exception.append(on_exception)
+    return trace
+
+# -----------------------
+# Bot mixin
+# -----------------------
+class MetricsMixin:
+    """Counts dispatched events, times prefix, hybrid and slash commands, and starts sampled traces."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("http_trace", trace_config())
+        super().__init__(*args, **kwargs)
+        global _bot
+        _bot = self
+        self.metrics_server = MetricsServer(self)
+
+    async def close(self):
+        await self.metrics_server.close()
+        await super().close()
+
+    def dispatch(self, event_name: str, /, *args, **kwargs):
+        EVENTS.inc(event_name)
+        # Listener tasks created by dispatch copy the context, so they join the trace
+        token = tracing.start_trace(event_name, args)
+        try:
+            super().dispatch(event_name, *args, **kwargs)
+        finally:
+            tracing.end_trace(token)
+
+    async def process_commands(self, message: discord.Message, /):
+        with tracing.span("process_commands", "command"):
+            await super().process_commands(message)
+
+    async def invoke(self, ctx: commands.Context, /):
+        start = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            if ctx.command is not None:
+                status = "error" if ctx.command_failed else "ok"
+                COMMAND_SECONDS.observe(time.perf_counter() - start, ctx.command.qualified_name, "prefix", status)
+
+    async def on_app_command_completion(self, interaction: discord.Interaction, command):
+        observe_app_command(interaction, "ok")
+
+def mark_app_command_start(interaction: discord.Interaction):
+    interaction.extras["metrics_start"] = time.perf_counter()
+
+def observe_app_command(interaction: discord.Interaction, status: str):
+    start = interaction.extras.get("metrics_start")
+    command = interaction.command
+    if start is not None and command is not None:
+        COMMAND_SECONDS.observe(time.perf_counter() - start, command.qualified_name, "app", status)
+
+# -----------------------
+# HTTP server
+# -----------------------
+class MetricsServer:
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._runner: web.AppRunner | None = None
+
+    async def start(self, host: str, port: int):
+        app = web.Application()
+        app.router.add_get("/metrics", self._metrics)
+        app.router.add_get("/healthz", self._health)
+        app.router.add_get("/readyz", self._ready)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        log.info(f"Metrics endpoint on http://{host}:{port}/metrics")
+
+    async def close(self):
+        if self._runner is not None:
+            runner, self._runner = self._runner, None
+            await runner.cleanup()
+
+    async def _metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def _health(self, request: web.Request) -> web.Response:
+        return web.Response(text="ok")
+
+    async def _ready(self, request: web.Request) -> web.Response:
+        if self.bot.is_ready() and not self.bot.is_closed():
+            return web.Response(text="ready")
+        return web.Response(status=503, text="not ready")
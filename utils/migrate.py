@@ -0,0 +1,238 @@
+"""One-shot importer from the legacy JSON files into the SQLite database.
+
+Run manually with ``python -m utils.migrate`` (add ``--force`` to import again),
+or let bot.py call ``migrate_if_needed()`` on startup.
+
+Level data can also be streamed to / from a record file for backups:
+``python -m utils.migrate --export-levels levels.msgpack`` and ``--import-levels``.
+The codec follows the file suffix (.msgpack, otherwise JSON lines).
+
+Every guild ends up with a single config document (see ``utils.storage.SECTIONS``).
+"""
+import json
+import logging
+import sys
+from pathlib import Path
+
+from utils import codec, database
+
+log = logging.getLogger("CM-V5.4")
+
+MIGRATION_KEY = "json_import_done"
+UNIFY_KEY = "config_unified"
+
+# Legacy locations
+LEGACY_SETTINGS_DIR = Path("guild_data")      # utils.storage and SecurityCog (*-config.json)
+LEGACY_PHISHING_DIR = Path("Guild_data")      # AntiPhishing
+LEGACY_JOINLEAVE_DIR = Path("data/guilds")    # JoinLeaveCog
+LEGACY_ROLES_DIR = Path("data/guilds/roles")  # RoleSelector
+LEGACY_LEVEL_FILE = Path("data/levels.json")
+LEGACY_AUTOROLE_FILE = Path("data/autorole.json")
+
+# Per-cog settings namespaces written by earlier versions of the database
+LEGACY_NAMESPACES = ("security", "joinleave", "phishing", "leveling")
+SECURITY_KEYS = ("raid_window_seconds", "raid_join_threshold", "min_account_age_days")
+
+def _load_json(path: Path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        log.warning(f"Skipping unreadable legacy file {path}: {e}")
+        return None
+
+def _guild_files(folder: Path, suffix: str = ".json"):
+    """Yield (guild_id, path) for files named <guild_id><suffix> in folder."""
+    if not folder.is_dir():
+        return
+    for path in folder.iterdir():
+        name = path.name
+        if path.is_file() and name.endswith(suffix) and name[:-len(suffix)].isdigit():
+            yield int(name[:-len(suffix)]), path
+
+# -----------------------
+# Unified config helpers
+# -----------------------
+def _merge(guild_id: int, section: str | None, values: dict, overwrite: bool = True):
+    """Merge values into a guild's config document (top level when section is None)."""
+    doc = database.load_settings(guild_id) or {}
+    target = doc if section is None else doc.setdefault(section, {})
+    for key, value in values.items():
+        if overwrite or target.get(key) is None:
+            target[key] = value
+    database.save_settings(guild_id, doc)
+
+def _merge_log_channels(guild_id: int, channels: dict):
+    """Fill logging channels without overriding ones configured through /setup."""
+    channels = {k: v for k, v in (channels or {}).items() if v}
+    if channels:
+        _merge(guild_id, "logging", channels, overwrite=False)
+
+def _merge_general(guild_id: int, data: dict):
+    data = dict(data)
+    _merge_log_channels(guild_id, data.pop("logging_channels", {}))
+    _merge(guild_id, None, data)
+
+def _merge_security(guild_id: int, data: dict):
+    _merge(guild_id, "security", {k: data[k] for k in SECURITY_KEYS if k in data})
+    _merge_log_channels(guild_id, data.get("logging_channels", {}))
+
+# -----------------------
+# JSON import
+# -----------------------
+def import_settings() -> int:
+    """Import guild settings, pulling daily reminders out into their own table."""
+    count = 0
+    for guild_id, path in _guild_files(LEGACY_SETTINGS_DIR):
+        data = _load_json(path)
+        if not isinstance(data, dict):
+            continue
+        # Idempotent, so --force doesn't duplicate reminders
+        for r in data.pop("daily_reminders", []):
+            database.add_reminder_once(guild_id, r["channel_id"], r["hour"], r["minute"],
+                                       r.get("title", ""), r.get("message", ""), r.get("last_sent"))
+        _merge_general(guild_id, data)
+        count += 1
+    for guild_id, path in _guild_files(LEGACY_SETTINGS_DIR, "-config.json"):
+        data = _load_json(path)
+        if isinstance(data, dict):
+            _merge_security(guild_id, data)
+            count += 1
+    for guild_id, path in _guild_files(LEGACY_PHISHING_DIR):
+        data = _load_json(path)
+        if isinstance(data, dict):
+            _merge_log_channels(guild_id, data.get("logging_channels", {}))
+            count += 1
+    for guild_id, path in _guild_files(LEGACY_JOINLEAVE_DIR):
+        data = _load_json(path)
+        if isinstance(data, dict) and data.get("joinleave_channel"):
+            _merge(guild_id, "joinleave", {"channel": data["joinleave_channel"]})
+            count += 1
+    return count
+
+def import_levels() -> int:
+    data = _load_json(LEGACY_LEVEL_FILE) if LEGACY_LEVEL_FILE.exists() else None
+    if not isinstance(data, dict):
+        return 0
+    rows = []
+    for guild_id, users in data.items():
+        for user_id, info in users.items():
+            if user_id == "level_channel":
+                _merge(int(guild_id), "leveling", {"channel": info})
+            elif isinstance(info, dict) and "xp" in info:
+                rows.append((int(guild_id), int(user_id), info["xp"], info.get("level", 0)))
+    database.save_levels(rows)
+    return len(rows)
+
+def import_autoroles() -> int:
+    data = _load_json(LEGACY_AUTOROLE_FILE) if LEGACY_AUTOROLE_FILE.exists() else None
+    if not isinstance(data, dict):
+        return 0
+    for guild_id, role_id in data.items():
+        _merge(int(guild_id), "autorole", {"role_id": role_id})
+    return len(data)
+
+def import_selector_roles() -> int:
+    count = 0
+    for guild_id, path in _guild_files(LEGACY_ROLES_DIR):
+        for role_id in _load_json(path) or []:
+            database.add_selector_role(guild_id, role_id)
+            count += 1
+    return count
+
+def import_all() -> dict:
+    """Import every legacy JSON file and mark the migration as done."""
+    report = {
+        "settings": import_settings(),
+        "levels": import_levels(),
+        "autoroles": import_autoroles(),
+        "selector_roles": import_selector_roles(),
+    }
+    database.set_meta(MIGRATION_KEY, json.dumps(report))
+    database.set_meta(UNIFY_KEY, "1")
+    log.info(f"Imported legacy JSON data into {database.DB_PATH}: {report}")
+    return report
+
+# -----------------------
+# Database upgrade
+# -----------------------
+def unify_namespaces() -> int:
+    """Fold per-cog settings rows and the autoroles table into each guild's config document."""
+    count = 0
+    for guild_id, data in database.load_all_settings(database.NS_GUILD).items():
+        if "logging_channels" in data:
+            database.save_settings(guild_id, {k: v for k, v in data.items() if k != "logging_channels"})
+            _merge_log_channels(guild_id, data["logging_channels"])
+            count += 1
+    for guild_id, data in database.load_all_settings("security").items():
+        _merge_security(guild_id, data)
+        count += 1
+    for guild_id, data in database.load_all_settings("phishing").items():
+        _merge_log_channels(guild_id, data.get("logging_channels", {}))
+        count += 1
+    for guild_id, data in database.load_all_settings("joinleave").items():
+        if data.get("joinleave_channel"):
+            _merge(guild_id, "joinleave", {"channel": data["joinleave_channel"]})
+            count += 1
+    for guild_id, data in database.load_all_settings("leveling").items():
+        if data.get("level_channel"):
+            _merge(guild_id, "leveling", {"channel": data["level_channel"]})
+            count += 1
+    conn = database.get_connection()
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'autoroles'").fetchone():
+        for guild_id, role_id in conn.execute("SELECT guild_id, role_id FROM autoroles").fetchall():
+            _merge(guild_id, "autorole", {"role_id": role_id})
+            count += 1
+        with conn:
+            conn.execute("DROP TABLE autoroles")
+    for namespace in LEGACY_NAMESPACES:
+        database.delete_namespace(namespace)
+    database.set_meta(UNIFY_KEY, "1")
+    return count
+
+# -----------------------
+# Level record streams
+# -----------------------
+def _codec_for(path: Path):
+    return codec.get_codec("msgpack") if path.suffix == ".msgpack" else codec.json_codec()
+
+def export_levels(path: Path) -> int:
+    """Stream every level row to a record file, one [guild, user, xp, level] record each."""
+    rows = ([g, u, xp, lvl] for g, u, xp, lvl in database.iter_levels())
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        count = _codec_for(path).write_stream(f, rows)
+    tmp.replace(path)
+    return count
+
+def import_level_records(path: Path, batch_size: int = 5000) -> int:
+    """Load a record file in batches, never holding the whole file in memory."""
+    count, batch = 0, []
+    for guild_id, user_id, xp, level in codec.iter_file(path, _codec_for(path)):
+        batch.append((guild_id, user_id, xp, level))
+        if len(batch) >= batch_size:
+            database.save_levels(batch)
+            count += len(batch)
+            batch = []
+    database.save_levels(batch)
+    return count + len(batch)
+
+def migrate_if_needed() -> dict | None:
+    """Run the import and the config unification once; later calls are no-ops."""
+    report = None
+    if database.get_meta(MIGRATION_KEY) is None:
+        report = import_all()
+    if database.get_meta(UNIFY_KEY) is None:
+        log.info(f"Unified {unify_namespaces()} legacy settings rows into per-guild config documents")
+    return report
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    if "--export-levels" in sys.argv:
+        print(f"Exported {export_levels(Path(sys.argv[sys.argv.index('--export-levels') + 1]))} level rows")
+    elif "--import-levels" in sys.argv:
+        print(f"Imported {import_level_records(Path(sys.argv[sys.argv.index('--import-levels') + 1]))} level rows")
+    elif "--force" in sys.argv or database.get_meta(MIGRATION_KEY) is None:
+        print(import_all())
+    else:
+        print("Legacy JSON already imported. Use --force to import again.")
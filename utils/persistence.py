@@ -0,0 +1,168 @@
+"""Off-event-loop persistence helpers.
+
+Every blocking save (SQLite upserts, JSON files) goes through a small bounded
+thread pool so the gateway loop never waits on disk. Saves are keyed: while a
+save for a key is running, newer saves for the same key collapse into a single
+follow-up write carrying the latest payload.
+"""
+import asyncio
+import atexit
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from utils.codec import get_codec
+
+log = logging.getLogger("CM-V5.4")
+
+MAX_WORKERS = 4
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="persist")
+_latest: dict[str, tuple[Callable, tuple]] = {}   # newest not-yet-started write per key
+_waiters: dict[str, asyncio.Future] = {}          # resolves when that write has finished
+_writers: dict[str, asyncio.Task] = {}            # drain task per key
+_flush_hooks: list[Callable[[], None]] = []
+_close_hooks: list[Callable[[], None]] = []
+
+# -----------------------
+# Atomic file writes
+# -----------------------
+def write_bytes_atomic(path: str | Path, payload: bytes):
+    """Write to a temp file in the same folder, fsync it, then rename over the target."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    # Persist the rename itself
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(path.parent, os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def write_atomic(path: str | Path, data: Any, codec=None):
+    """Serialize data with a codec (default: STORAGE_CODEC) and atomically replace path with it."""
+    write_bytes_atomic(path, (codec or get_codec()).dumps(data))
+
+def write_json_atomic(path: str | Path, data: Any, indent: int | None = 4):
+    """Serialize data as JSON and atomically replace path with it."""
+    write_bytes_atomic(path, get_codec("json").dumps(data, indent=indent))
+
+def append_records(path: str | Path, records: Iterable[Any], codec=None) -> int:
+    """Append records to a stream file and fsync; existing content is never rewritten."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "ab") as f:
+        count = (codec or get_codec()).write_stream(f, records)
+        f.flush()
+        os.fsync(f.fileno())
+    return count
+
+# -----------------------
+# Thread pool API
+# -----------------------
+async def run(func: Callable, *args):
+    """Run a blocking call on the persistence pool and return its result."""
+    return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+async def save(key: str, func: Callable, *args):
+    """Run func(*args) on the pool; concurrent saves of the same key coalesce into one."""
+    await asyncio.shield(_submit(key, func, args))
+
+def schedule(key: str, func: Callable, *args) -> asyncio.Future | None:
+    """Fire-and-forget version of save(). Runs inline when no event loop is running.
+
+    Returns a future that completes (or fails) once the write of this key has
+    landed, for callers that need to know; None when it ran inline.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        func(*args)
+        return None
+    return _submit(key, func, args)
+
+async def save_json(path: str | Path, data: Any, indent: int | None = 4):
+    """Atomically write a JSON file off the event loop (coalesced per path)."""
+    await save(str(path), write_json_atomic, path, data, indent)
+
+def _submit(key: str, func: Callable, args: tuple) -> asyncio.Future:
+    loop = asyncio.get_running_loop()
+    _latest[key] = (func, args)
+    waiter = _waiters.get(key)
+    if waiter is None:
+        waiter = _waiters[key] = loop.create_future()
+        # Errors are logged by the drain task; don't warn about unread exceptions
+        waiter.add_done_callback(lambda f: f.cancelled() or f.exception())
+    if key not in _writers:
+        _writers[key] = loop.create_task(_drain(key))
+    return waiter
+
+async def _drain(key: str):
+    loop = asyncio.get_running_loop()
+    try:
+        while key in _latest:
+            func, args = _latest.pop(key)
+            waiter = _waiters.pop(key)
+            try:
+                await loop.run_in_executor(_executor, func, *args)
+            except Exception as e:
+                log.error(f"Persisting {key} failed: {e}")
+                waiter.set_exception(e)
+            else:
+                waiter.set_result(None)
+    finally:
+        del _writers[key]
+
+async def wait_idle():
+    """Wait until every queued save has been written."""
+    while _writers:
+        await asyncio.gather(*_writers.values(), return_exceptions=True)
+
+# -----------------------
+# Shutdown
+# -----------------------
+def on_flush(func: Callable[[], None]):
+    """Register a callback that pushes buffered state out before the final drain."""
+    _flush_hooks.append(func)
+
+def remove_flush_hook(func: Callable[[], None]):
+    """Undo on_flush(), e.g. when the cog that registered it is unloaded."""
+    if func in _flush_hooks:
+        _flush_hooks.remove(func)
+
+def on_close(func: Callable[[], None]):
+    """Register a callback that runs after every pending write has landed."""
+    _close_hooks.append(func)
+
+def shutdown():
+    """Flush buffers, write whatever is still queued, then close resources."""
+    for hook in _flush_hooks:
+        hook()
+    _executor.shutdown(wait=True)
+    # Writes whose drain task never got to run (the loop is gone)
+    for key, (func, args) in list(_latest.items()):
+        try:
+            func(*args)
+        except Exception as e:
+            log.error(f"Persisting {key} at shutdown failed: {e}")
+    _latest.clear()
+    for hook in _close_hooks:
+        hook()
+
+atexit.register(shutdown)
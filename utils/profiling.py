@@ -0,0 +1,166 @@
+"""On-demand CPU profiles and memory breakdowns for the owner diagnostics commands."""
+import asyncio
+import cProfile
+import functools
+import io
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, deque
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+TOP_N = 40
+
+# -----------------------
+# CPU
+# -----------------------
+async def cprofile_for(seconds: float, top: int = TOP_N) -> str:
+    """Profile the event loop thread with cProfile for `seconds`; returns a pstats report."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        profiler.disable()
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out).strip_dirs()
+    out.write(f"cProfile, {seconds:.0f}s, sorted by own time\n")
+    stats.sort_stats("tottime").print_stats(top)
+    out.write("\nSorted by cumulative time\n")
+    stats.sort_stats("cumulative").print_stats(top)
+    return out.getvalue()
+
+def _frame_key(frame) -> str:
+    return f"{_short_path(frame.f_code.co_filename)}:{frame.f_code.co_firstlineno} {frame.f_code.co_name}"
+
+async def sample_for(seconds: float, hz: int = 100, top: int = TOP_N) -> str:
+    """Sample the loop thread's stack from another thread; low overhead, safe in production."""
+    target = threading.get_ident()
+    own, inclusive = Counter(), Counter()
+    samples = 0
+    stop = threading.Event()
+
+    def run():
+        nonlocal samples
+        while not stop.wait(1 / hz):
+            frame = sys._current_frames().get(target)
+            if frame is None:
+                continue
+            samples += 1
+            own[_frame_key(frame)] += 1
+            seen = set()
+            while frame is not None:
+                key = _frame_key(frame)
+                if key not in seen:
+                    seen.add(key)
+                    inclusive[key] += 1
+                frame = frame.f_back
+
+    thread = threading.Thread(target=run, name="sampler", daemon=True)
+    thread.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        stop.set()
+        await asyncio.to_thread(thread.join)
+
+    lines = [f"Sampling profile, {seconds:.0f}s at {hz} Hz, {samples} samples", "", "Own time:"]
+    lines += [f"{n / samples:7.1%}  {key}" for key, n in own.most_common(top)] if samples else []
+    lines += ["", "Inclusive time:"]
+    lines += [f"{n / samples:7.1%}  {key}" for key, n in inclusive.most_common(top)] if samples else []
+    return "\n".join(lines)
+
+# -----------------------
+# Memory
+# -----------------------
+@functools.lru_cache(maxsize=4096)
+def _project_module(filename: str) -> str | None:
+    """'cogs.leveling' for <root>/cogs/leveling.py, None for files outside the project."""
+    try:
+        relative = Path(filename).resolve().relative_to(PROJECT_ROOT)
+    except (ValueError, OSError):
+        return None
+    return relative.with_suffix("").as_posix().replace("/", ".")
+
+def _short_path(filename: str) -> str:
+    module = _project_module(filename)
+    return module if module else Path(filename).name
+
+def _owner(traceback: tracemalloc.Traceback) -> str:
+    """First project frame of an allocation: 'cogs.leveling', 'utils.storage', 'bot' or 'other'."""
+    for frame in traceback:   # most recent call first
+        module = _project_module(frame.filename)
+        if module:
+            return module
+    return "other"
+
+def group_by_owner(snapshot: tracemalloc.Snapshot) -> dict[str, int]:
+    totals = Counter()
+    for trace in snapshot.traces:
+        totals[_owner(trace.traceback)] += trace.size
+    return dict(totals)
+
+def snapshot_report(current: tracemalloc.Snapshot, previous: tracemalloc.Snapshot | None, top: int = 20) -> str:
+    """Bytes per cog/module, with the change since the previous snapshot."""
+    now = group_by_owner(current)
+    before = group_by_owner(previous) if previous else {}
+    lines = [f"{'owner':<28}{'KiB':>12}{'change KiB':>14}"]
+    for owner in sorted(now.keys() | before.keys(), key=lambda o: now.get(o, 0), reverse=True):
+        size, delta = now.get(owner, 0), now.get(owner, 0) - before.get(owner, 0)
+        lines.append(f"{owner:<28}{size / 1024:>12.1f}{delta / 1024:>+14.1f}")
+    if previous:
+        lines += ["", f"Top {top} growing lines since the previous snapshot:"]
+        for stat in current.compare_to(previous, "lineno")[:top]:
+            lines.append(str(stat))
+    return "\n".join(lines)
+
+_CONTAINERS = (dict, list, tuple, set, frozenset, deque)
+
+def deep_sizeof(obj, sample: int = 200) -> int:
+    """Approximate bytes held by nested builtin containers.
+
+    Containers larger than `sample` items are estimated from their first `sample` items.
+    Other objects (discord models, the bot...) count only their shallow size.
+    """
+    seen = set()
+
+    def size(o) -> int:
+        if id(o) in seen:
+            return 0
+        seen.add(id(o))
+        total = sys.getsizeof(o)
+        if not isinstance(o, _CONTAINERS):
+            return total
+        items = o.items() if isinstance(o, dict) else o
+        n = len(o)
+        walked, count = 0, 0
+        for item in items:
+            if count == sample:
+                break
+            walked += sum(map(size, item)) if isinstance(o, dict) else size(item)
+            count += 1
+        return total + (walked * n // count if count else 0)
+
+    return size(obj)
+
+def structure_sizes(cogs) -> list[tuple[str, int]]:
+    """Deep size of every builtin-container attribute of every cog, largest first."""
+    sizes = []
+    for cog in cogs:
+        for name, value in vars(cog).items():
+            if isinstance(value, _CONTAINERS):
+                sizes.append((f"{cog.qualified_name}.{name}", deep_sizeof(value)))
+    return sorted(sizes, key=lambda s: s[1], reverse=True)
+
+def format_sizes(sizes: list[tuple[str, int]], previous: dict[str, int] | None = None) -> str:
+    previous = previous or {}
+    lines = [f"{'structure':<40}{'KiB':>12}{'change KiB':>14}"]
+    for name, size in sizes:
+        lines.append(f"{name:<40}{size / 1024:>12.1f}{(size - previous.get(name, 0)) / 1024:>+14.1f}")
+    return "\n".join(lines)
+
+def timestamp() -> str:
+    return time.strftime("%Y%m%d-%H%M%S")
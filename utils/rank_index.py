@@ -0,0 +1,284 @@
+"""Per-guild XP ranking kept sorted as XP changes.
+
+A RankIndex orders the members of one guild's XP store (utils.xp_store) by XP,
+highest first, ties by user id. An XP change moves a single member in
+O(log n); a member's position, the top N and any leaderboard page are read
+without sorting or scanning.
+
+The order is held as store slot numbers (uint32) in typed-array blocks of up to
+2 * LOAD entries, about 4 bytes per member. Sort keys are not stored: they are
+read from the store's columns while searching. Each block's last key and a
+Fenwick tree over the block sizes turn a position into a block and back in
+O(log blocks).
+
+An index can be built on another thread from a copy of the XP column taken on
+the event loop (RankIndex(store, xps)); catch_up() then replays, on the loop,
+whatever changed in the store meanwhile.
+"""
+from array import array
+from bisect import bisect_left
+from typing import Callable
+
+from utils.xp_store import GuildLevels
+
+LOAD = 512   # entries per block after a split; a block splits at 2 * LOAD
+CATCH_UP_CHUNK = 4096   # XP entries compared at once when looking for changes after a build
+
+_ID_BITS = 64
+_XP_MAX = (1 << 63) - 1
+
+def _key(user_id: int, xp: int) -> int:
+    return ((_XP_MAX - xp) << _ID_BITS) | user_id
+
+class RankIndex:
+    def __init__(self, store: GuildLevels, xps: array | None = None):
+        """xps: a copy of store.xp to sort by, when building off the event loop (see catch_up)."""
+        self._store = store
+        self._bind(store.xp if xps is None else xps)
+        slots = sorted(range(len(self._xps)), key=self._slot_key)
+        self._blocks = [array("I", slots[i:i + LOAD]) for i in range(0, len(slots), LOAD)]
+        self._maxes = [self._slot_key(block[-1]) for block in self._blocks]
+        self._len = len(slots)
+        self._build_tree()
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _bind(self, xps: array):
+        # The store appends to its arrays in place, so references to them stay valid.
+        # Sort keys are built inline (one call per probe) since searches run on every XP gain
+        self._user_ids, self._xps = user_ids, xps = self._store.user_ids, xps
+        self._slot_key: Callable[[int], int] = lambda slot: ((_XP_MAX - xps[slot]) << _ID_BITS) | user_ids[slot]
+
+    def catch_up(self):
+        """Apply the store changes made since the XP copy was taken, then follow the store itself."""
+        xps, live = self._xps, self._store.xp
+        if xps is live:
+            return
+        user_ids = self._user_ids
+        for start in range(0, len(xps), CATCH_UP_CHUNK):
+            stop = min(start + CATCH_UP_CHUNK, len(xps))
+            if xps[start:stop] == live[start:stop]:
+                continue
+            for slot in range(start, stop):
+                if xps[slot] != live[slot]:
+                    old_xp, xps[slot] = xps[slot], live[slot]
+                    self.update(user_ids[slot], old_xp, live[slot], slot)
+        for slot in range(len(xps), len(live)):
+            xps.append(live[slot])
+            self.update(user_ids[slot], None, live[slot], slot)
+        self._bind(live)
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + sum(block.__sizeof__() for block in self._blocks) \
+            + self._maxes.__sizeof__() + self._tree.__sizeof__()
+
+    # -------------------
+    # Block bookkeeping
+    # -------------------
+    def _build_tree(self):
+        """Fenwick tree of block sizes; rebuilt whenever blocks are split, merged or dropped."""
+        tree = [0] * (len(self._blocks) + 1)
+        for i, block in enumerate(self._blocks, 1):
+            tree[i] += len(block)
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _grow_block(self, b: int, delta: int):
+        tree = self._tree
+        i = b + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def _offset(self, b: int) -> int:
+        """Entries in the blocks before block b."""
+        tree, total = self._tree, 0
+        while b:
+            total += tree[b]
+            b -= b & -b
+        return total
+
+    def _find(self, pos: int) -> tuple[int, int]:
+        """(block, index in block) of the 0-based position pos < len(self)."""
+        tree = self._tree
+        b, step = 0, 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = b + step
+            if nxt < len(tree) and tree[nxt] <= pos:
+                b = nxt
+                pos -= tree[nxt]
+            step >>= 1
+        return b, pos
+
+    def _locate(self, key: int, slot_key: Callable[[int], int]) -> tuple[int, int]:
+        """(block, index in block) of the first entry whose key is >= key."""
+        b = bisect_left(self._maxes, key)
+        if b == len(self._maxes):
+            return b, 0
+        return b, bisect_left(self._blocks[b], key, key=slot_key)
+
+    # -------------------
+    # Updates
+    # -------------------
+    def _find_stale(self, slot: int, key: int) -> tuple[int, int]:
+        """(block, index in block) of slot, still sorted under its old key."""
+        user_ids, xps = self._user_ids, self._xps
+        # The store already holds the new XP; compare this slot under its old key
+        return self._locate(key, lambda s: key if s == slot else ((_XP_MAX - xps[s]) << _ID_BITS) | user_ids[s])
+
+    def _remove(self, b: int, i: int) -> int:
+        """Drop entry i of block b; returns its former position."""
+        block = self._blocks[b]
+        pos = self._offset(b) + i
+        del block[i]
+        self._len -= 1
+        if not block:
+            del self._blocks[b], self._maxes[b]
+            self._build_tree()
+            return pos
+        if i == len(block):
+            self._maxes[b] = self._slot_key(block[-1])
+        if len(block) < LOAD // 2 and len(self._blocks) > 1:
+            self._merge(b)
+        else:
+            self._grow_block(b, -1)
+        return pos
+
+    def _merge(self, b: int):
+        """Fold a shrunken block into a neighbour so blocks can't dwindle to a few entries each."""
+        blocks, maxes = self._blocks, self._maxes
+        lo = b if b + 1 < len(blocks) else b - 1
+        blocks[lo].extend(blocks[lo + 1])
+        del blocks[lo + 1], maxes[lo]
+        block = blocks[lo]
+        if len(block) > 2 * LOAD:
+            half = len(block) // 2
+            blocks.insert(lo + 1, block[half:])
+            del block[half:]
+            maxes.insert(lo, self._slot_key(block[-1]))
+        self._build_tree()
+
+    def _insert(self, slot: int, key: int) -> int:
+        """Add slot under key; returns its position."""
+        blocks, maxes = self._blocks, self._maxes
+        self._len += 1
+        if not blocks:
+            blocks.append(array("I", [slot]))
+            maxes.append(key)
+            self._build_tree()
+            return 0
+        b, i = self._locate(key, self._slot_key)
+        if b == len(blocks):
+            # Beyond every entry: goes to the end of the last block
+            b -= 1
+            i = len(blocks[b])
+            maxes[b] = key
+        block = blocks[b]
+        block.insert(i, slot)
+        pos = self._offset(b) + i
+        if len(block) > 2 * LOAD:
+            blocks.insert(b + 1, block[LOAD:])
+            del block[LOAD:]
+            maxes.insert(b, self._slot_key(block[-1]))
+            self._build_tree()
+        else:
+            self._grow_block(b, 1)
+        return pos
+
+    def _gallop(self, block: array, key: int, i: int) -> int:
+        """bisect_left(block, key, 0, i) probing backwards from i first: gains rarely move a member far."""
+        slot_key = self._slot_key
+        hi, step = i, 1
+        while hi:
+            lo = max(0, hi - step)
+            if slot_key(block[lo]) < key:
+                return bisect_left(block, key, lo + 1, hi, key=slot_key)
+            hi, step = lo, step * 2
+        return 0
+
+    def update(self, user_id: int, old_xp: int | None, xp: int, slot: int | None = None) -> tuple[int, int] | None:
+        """Move a member after their XP changed (old_xp None: newly tracked).
+
+        The store must already hold the new XP; pass the member's store slot
+        when it is at hand to save a lookup. Returns the 1-based range of ranks
+        now held by someone else, or None when nobody's position changed.
+        """
+        if old_xp == xp:
+            return None
+        if slot is None:
+            slot = self._store.slot(user_id)
+        key = _key(user_id, xp)
+        if old_xp is None:
+            # Everyone from the new position down shifted by one
+            return self._insert(slot, key) + 1, self._len
+        old_key = _key(user_id, old_xp)
+        b, i = self._find_stale(slot, old_key)
+        block, maxes = self._blocks[b], self._maxes
+        if key < old_key and (b == 0 or key > maxes[b - 1]):
+            # An XP gain that stays inside the member's block (the usual case): shift it within
+            # the block, leaving block sizes and every other block alone
+            j = self._gallop(block, key, i)
+            last = i == len(block) - 1
+            if j < i:
+                del block[i]
+                block.insert(j, slot)
+            if last:
+                maxes[b] = self._slot_key(block[-1])
+            if j == i:
+                return None
+            offset = self._offset(b)
+            return offset + j + 1, offset + i + 1
+        old_pos = self._remove(b, i)
+        new_pos = self._insert(slot, key)
+        if old_pos == new_pos:
+            return None
+        return min(old_pos, new_pos) + 1, max(old_pos, new_pos) + 1
+
+    # -------------------
+    # Reads
+    # -------------------
+    def rank(self, user_id: int) -> int | None:
+        """1-based position of the member, or None when they have no XP."""
+        xp = self._store.get_xp(user_id)
+        if xp is None:
+            return None
+        b, i = self._locate(_key(user_id, xp), self._slot_key)
+        return self._offset(b) + i + 1
+
+    def slice(self, start: int, stop: int) -> list[tuple[int, int, int]]:
+        """(rank, user_id, xp) for positions start..stop-1 (0-based)."""
+        start, stop = max(0, start), min(stop, self._len)
+        if start >= stop:
+            return []
+        user_ids, xps = self._store.user_ids, self._store.xp
+        b, i = self._find(start)
+        entries = []
+        rank = start + 1
+        while rank <= stop:
+            block = self._blocks[b]
+            for slot in block[i:i + stop + 1 - rank]:
+                entries.append((rank, user_ids[slot], xps[slot]))
+                rank += 1
+            b, i = b + 1, 0
+        return entries
+
+    def top(self, n: int) -> list[tuple[int, int, int]]:
+        return self.slice(0, n)
+
+    def page(self, page: int, per_page: int = 10) -> list[tuple[int, int, int]]:
+        """Entries of a 1-based leaderboard page."""
+        start = (page - 1) * per_page
+        return self.slice(start, start + per_page)
+
+    def page_count(self, per_page: int = 10) -> int:
+        return max(1, -(-len(self) // per_page))
+
+    def around(self, user_id: int, radius: int = 2) -> list[tuple[int, int, int]]:
+        """The member and up to `radius` neighbours on each side."""
+        rank = self.rank(user_id)
+        if rank is None:
+            return []
+        return self.slice(rank - 1 - radius, rank + radius)
@@ -0,0 +1,102 @@
+"""Startup work that must not repeat when the gateway reconnects.
+
+``on_ready`` fires after every resume failure / reconnect, so anything done
+there has to be guarded with ``first_time()``. The command tree is only pushed
+to Discord when the hash of its command signatures differs from the one stored
+in the database after the previous sync.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Iterable
+
+import discord
+from discord import app_commands
+
+from utils import database, persistence
+
+log = logging.getLogger("CM-V5.4")
+
+TREE_HASH_KEY = "command_tree_hash"
+
+_done: set[str] = set()
+
+def first_time(key: str) -> bool:
+    """True the first time it is called for key in this process, False afterwards."""
+    if key in _done:
+        return False
+    _done.add(key)
+    return True
+
+# -----------------------
+# Command tree sync
+# -----------------------
+def _command_payload(command, tree: app_commands.CommandTree) -> dict:
+    try:
+        return command.to_dict(tree)   # discord.py >= 2.4
+    except TypeError:
+        return command.to_dict()
+
+def command_payload(tree: app_commands.CommandTree, commands: Iterable) -> list[dict]:
+    """The JSON Discord receives for these commands, in a stable order."""
+    return sorted(
+        (_command_payload(cmd, tree) for cmd in commands),
+        key=lambda c: (c.get("type", 1), c["name"])
+    )
+
+def payload_hash(payload: list[dict]) -> str:
+    blob = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+def command_tree_hash(tree: app_commands.CommandTree, guild: discord.abc.Snowflake | None = None) -> str:
+    """Stable hash of the commands that a sync for guild (None: global) would upload."""
+    return payload_hash(command_payload(tree, tree.get_commands(guild=guild)))
+
+async def sync_if_changed(tree: app_commands.CommandTree, force: bool = False) -> int | None:
+    """Sync global commands only when their signatures changed. Returns the synced count or None."""
+    digest = command_tree_hash(tree)
+    if not force and await persistence.run(database.get_meta, TREE_HASH_KEY) == digest:
+        log.info("Command tree unchanged since the last sync; skipping")
+        return None
+    synced = await tree.sync()
+    await persistence.run(database.set_meta, TREE_HASH_KEY, digest)
+    return len(synced)
+
+# -----------------------
+# Bounded fan-out
+# -----------------------
+class RateLimiter:
+    """Lets at most `rate` callers through per second, spaced evenly."""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+                now = self._next
+            self._next = now + self.interval
+
+async def fan_out(items: Iterable, func: Callable[..., Awaitable], concurrency: int = 5, rate: float = 5.0) -> int:
+    """Run func(item) for every item with bounded concurrency and rate; returns how many succeeded."""
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = RateLimiter(rate)
+
+    async def run(item) -> bool:
+        async with semaphore:
+            await limiter.wait()
+            try:
+                await func(item)
+                return True
+            except discord.HTTPException as e:
+                log.warning(f"Startup notification for {item} failed: {e}")
+                return False
+
+    results = await asyncio.gather(*(run(item) for item in items))
+    return sum(results)
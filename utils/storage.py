@@ -1,65 +1,306 @@
-import json
-from pathlib import Path
+import asyncio
+import contextlib
+import copy
+import functools
+import time
+import weakref
+from types import MappingProxyType
+from typing import Any, Callable, Mapping
 
-# Folder to store guild data
-DATA_FOLDER = Path("guild_data")
-DATA_FOLDER.mkdir(exist_ok=True)  # Create if not exists
+from utils import database, persistence
 
-def get_guild_file(guild_id: int) -> Path:
-    """Return the path to a guild's JSON file."""
-    return DATA_FOLDER / f"{guild_id}.json"
+# -----------------------
+# Config layout
+# -----------------------
+# One document per guild. Top-level keys hold general settings (config_channel,
+# disabled_cogs); each feature keeps its own section.
+SECTIONS = ("logging", "security", "leveling", "joinleave", "autorole")
+
+DEFAULT_SECTIONS = {
+    "logging": {},  # log type -> channel id ("mod-log", "audit-log", "security-log", ...)
+    "security": {
+        "raid_window_seconds": 10,
+        "raid_join_threshold": 5,
+        "min_account_age_days": 7,
+    },
+    "leveling": {"channel": None, "curve_base": 100, "curve_exponent": 1.5},  # XP curve: see utils.level_curve
+    "joinleave": {"channel": None},
+    "autorole": {"role_id": None},
+}
+
+# -----------------------
+# Settings cache
+# -----------------------
+FLUSH_DELAY = 5.0        # Seconds a changed guild waits before it is written to the database
+IDLE_TTL = 30 * 60       # Seconds an untouched, clean guild stays in memory
+EVICT_INTERVAL = 60.0    # Minimum seconds between two idle sweeps
+
+_cache: dict[int, dict] = {}
+_snapshots: dict[int, Mapping] = {}
+_last_access: dict[int, float] = {}
+_dirty: set[int] = set()   # changed guilds; cleared only once their write has landed
+_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+_subscribers: list[Callable[[int], None]] = []
+_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+_flush_handle: asyncio.TimerHandle | None = None
+_last_sweep = time.monotonic()
+
+def _read_guild_settings(guild_id: int) -> dict:
+    return database.load_settings(guild_id) or {}
+
+def _write_guild_settings(guild_id: int, settings: dict):
+    database.save_settings(guild_id, settings)
+    _stats["writes"] += 1
+
+def _schedule_flush():
+    """Debounce writes: one flush runs FLUSH_DELAY seconds after the first pending change."""
+    global _flush_handle
+    if _flush_handle is not None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # No event loop (scripts, shutdown): write straight through
+        flush_guild_settings()
+        return
+    _flush_handle = loop.call_later(FLUSH_DELAY, _run_scheduled_flush)
+
+def _run_scheduled_flush():
+    """Hand every changed guild to the persistence pool (off the event loop)."""
+    global _flush_handle
+    _flush_handle = None
+    for guild_id in list(_dirty):
+        settings = _cache.get(guild_id)
+        if settings is None:
+            _dirty.discard(guild_id)
+            continue
+        # Cached dicts are replaced, never mutated, so the pool can serialize this one safely
+        written = persistence.schedule(f"settings:{guild_id}", _write_guild_settings, guild_id, settings)
+        written.add_done_callback(functools.partial(_settings_written, guild_id, settings))
+
+def _settings_written(guild_id: int, settings: dict, written: asyncio.Future):
+    """Mark the guild clean once its write landed; a failed write is retried by the next flush."""
+    if written.cancelled() or written.exception() is not None:
+        _schedule_flush()
+    elif _cache.get(guild_id) is settings:
+        # Changed again while writing: it stays dirty and goes out with the next flush
+        _dirty.discard(guild_id)
+
+def _evict_idle(now: float):
+    """Drop clean guilds that have not been touched for IDLE_TTL seconds."""
+    global _last_sweep
+    if now - _last_sweep < EVICT_INTERVAL:
+        return
+    _last_sweep = now
+    for guild_id, last in list(_last_access.items()):
+        if now - last >= IDLE_TTL and guild_id not in _dirty:
+            _cache.pop(guild_id, None)
+            _snapshots.pop(guild_id, None)
+            del _last_access[guild_id]
+            _stats["evictions"] += 1
+
+def _load(guild_id: int) -> dict:
+    """Return the cached settings dict (never hand it out mutable).
+
+    Guilds are loaded ahead of time by warm() (startup, guild join), so a miss
+    here is normally a guild evicted after IDLE_TTL that became active again:
+    one primary-key read on the event loop, at most once per idle period per
+    guild. That cost is accepted; call warm() first on paths that touch many
+    guilds at once.
+    """
+    now = time.monotonic()
+    settings = _cache.get(guild_id)
+    if settings is None:
+        _stats["misses"] += 1
+        settings = _cache[guild_id] = _read_guild_settings(guild_id)
+    else:
+        _stats["hits"] += 1
+    _last_access[guild_id] = now
+    _evict_idle(now)
+    return settings
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+async def warm(guild_ids) -> int:
+    """Load the settings of every uncached guild in one query on the persistence pool.
+
+    Returns how many guilds were added to the cache.
+    """
+    missing = [gid for gid in guild_ids if gid not in _cache]
+    if not missing:
+        return 0
+    found = await persistence.run(database.load_settings_many, missing)
+    now = time.monotonic()
+    added = 0
+    for guild_id in missing:
+        # A guild loaded or changed on the loop meanwhile is at least as fresh
+        if guild_id not in _cache:
+            _cache[guild_id] = found.get(guild_id, {})
+            _last_access[guild_id] = now
+            added += 1
+    return added
 
 def get_guild_settings(guild_id: int) -> dict:
-    """Load guild settings from JSON, or return default empty dict."""
-    file_path = get_guild_file(guild_id)
-    if file_path.exists():
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+    """Return a mutable copy of the guild settings (for read-modify-write), or default empty dict."""
+    return copy.deepcopy(_load(guild_id))
+
+def get_guild_config(guild_id: int) -> Mapping:
+    """Return the guild's read-only config snapshot with every section filled from defaults.
+
+    The snapshot is built once per change and shared, so all cogs handling the
+    same gateway event read the same object without copying or touching storage.
+    """
+    settings = _load(guild_id)
+    snapshot = _snapshots.get(guild_id)
+    if snapshot is not None:
+        return snapshot
+    config = dict(settings)
+    for section, defaults in DEFAULT_SECTIONS.items():
+        config[section] = {**defaults, **settings.get(section, {})}
+    snapshot = _snapshots[guild_id] = _freeze(config)
+    return snapshot
 
 def set_guild_settings(guild_id: int, settings: dict):
-    """Save guild settings to JSON with indentation for readability."""
-    file_path = get_guild_file(guild_id)
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(settings, f, indent=4, ensure_ascii=False)
+    """Store guild settings in the cache and queue a debounced write to the database."""
+    if settings == _cache.get(guild_id):
+        return
+    _cache[guild_id] = copy.deepcopy(settings)
+    _snapshots.pop(guild_id, None)
+    _last_access[guild_id] = time.monotonic()
+    _dirty.add(guild_id)
+    _schedule_flush()
+    notify_changed(guild_id)
+
+def flush_guild_settings():
+    """Write every changed guild to the database right away."""
+    global _flush_handle
+    if _flush_handle is not None:
+        _flush_handle.cancel()
+        _flush_handle = None
+    while _dirty:
+        guild_id = _dirty.pop()
+        if guild_id in _cache:
+            _write_guild_settings(guild_id, _cache[guild_id])
+
+def get_cache_stats() -> dict:
+    """Return hit/miss counters and the current size of the settings cache."""
+    return {**_stats, "cached": len(_cache), "dirty": len(_dirty)}
+
+# Never lose debounced writes when the process exits
+persistence.on_flush(flush_guild_settings)
+
+# -----------------------
+# Change notifications
+# -----------------------
+def subscribe(callback: Callable[[int], None]):
+    """Call callback(guild_id) whenever that guild's config changes."""
+    _subscribers.append(callback)
+
+def unsubscribe(callback: Callable[[int], None]):
+    if callback in _subscribers:
+        _subscribers.remove(callback)
+
+def notify_changed(guild_id: int):
+    """Tell subscribers that anything derived from this guild's config is stale."""
+    for callback in list(_subscribers):
+        callback(guild_id)
+
+class DerivedCache:
+    """Per-guild values built from the config snapshot, rebuilt only after the config changes.
+
+    build(guild, config) runs on first use per guild; call close() from cog_unload.
+    """
+
+    def __init__(self, build: Callable[[Any, Mapping], Any]):
+        self._build = build
+        self._values: dict[int, Any] = {}
+        subscribe(self.invalidate)
+
+    def get(self, guild) -> Any:
+        try:
+            return self._values[guild.id]
+        except KeyError:
+            value = self._values[guild.id] = self._build(guild, get_guild_config(guild.id))
+            return value
+
+    def invalidate(self, guild_id: int):
+        self._values.pop(guild_id, None)
+
+    def close(self):
+        unsubscribe(self.invalidate)
+        self._values.clear()
+
+# -----------------------
+# Transactions
+# -----------------------
+def _guild_lock(guild_id: int) -> asyncio.Lock:
+    # Locks live only while someone holds or waits on them
+    lock = _locks.get(guild_id)
+    if lock is None:
+        lock = _locks[guild_id] = asyncio.Lock()
+    return lock
+
+@contextlib.asynccontextmanager
+async def transaction(guild_id: int):
+    """Read-modify-write one guild's settings under that guild's lock.
+
+        async with storage.transaction(guild_id) as settings:
+            settings["config_channel"] = channel_id
+
+    Changes are stored when the block exits normally and dropped if it raises.
+    Other guilds never wait on this lock.
+    """
+    async with _guild_lock(guild_id):
+        settings = get_guild_settings(guild_id)
+        yield settings
+        set_guild_settings(guild_id, settings)
+
+async def update_section(guild_id: int, section: str, **values):
+    """Merge values into one config section, e.g. await update_section(gid, "leveling", channel=123)."""
+    if section not in SECTIONS:
+        raise KeyError(f"Unknown config section: {section}")
+    async with transaction(guild_id) as settings:
+        settings.setdefault(section, {}).update(values)
 
 # -----------------------
 # Config channel methods
 # -----------------------
 def get_config_channel_id(guild_id: int) -> int | None:
     """Return saved config channel ID if exists."""
-    return get_guild_settings(guild_id).get("config_channel")
+    return get_guild_config(guild_id).get("config_channel")
 
-def set_config_channel_id(guild_id: int, channel_id: int):
+async def set_config_channel_id(guild_id: int, channel_id: int):
     """Save config channel ID in guild settings."""
-    settings = get_guild_settings(guild_id)
-    settings["config_channel"] = channel_id
-    set_guild_settings(guild_id, settings)
+    async with transaction(guild_id) as settings:
+        settings["config_channel"] = channel_id
 
 # -----------------------
 # Disabled cogs methods
 # -----------------------
 def get_disabled_cogs(guild_id: int) -> list:
     """Return a list of cog names disabled for this guild."""
-    settings = get_guild_settings(guild_id)
-    return settings.get("disabled_cogs", [])
+    return list(get_guild_config(guild_id).get("disabled_cogs", ()))
 
-def set_disabled_cogs(guild_id: int, disabled: list):
+async def set_disabled_cogs(guild_id: int, disabled: list):
     """Save the list of disabled cogs for this guild."""
-    settings = get_guild_settings(guild_id)
-    settings["disabled_cogs"] = disabled
-    set_guild_settings(guild_id, settings)
+    async with transaction(guild_id) as settings:
+        settings["disabled_cogs"] = list(disabled)
 
-def disable_cog_for_guild(guild_id: int, cog_name: str):
+async def disable_cog_for_guild(guild_id: int, cog_name: str):
     """Disable a single cog for the guild."""
-    disabled = get_disabled_cogs(guild_id)
-    if cog_name not in disabled:
-        disabled.append(cog_name)
-        set_disabled_cogs(guild_id, disabled)
+    async with transaction(guild_id) as settings:
+        disabled = settings.setdefault("disabled_cogs", [])
+        if cog_name not in disabled:
+            disabled.append(cog_name)
 
-def enable_cog_for_guild(guild_id: int, cog_name: str):
+async def enable_cog_for_guild(guild_id: int, cog_name: str):
     """Enable a single cog for the guild."""
-    disabled = get_disabled_cogs(guild_id)
-    if cog_name in disabled:
-        disabled.remove(cog_name)
-        set_disabled_cogs(guild_id, disabled)
+    async with transaction(guild_id) as settings:
+        disabled = settings.setdefault("disabled_cogs", [])
+        if cog_name in disabled:
+            disabled.remove(cog_name)
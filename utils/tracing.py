@@ -0,0 +1,112 @@
+"""Sampled per-event span tracing to a rotating JSON lines file.
+
+When a gateway event is sampled (TRACE_SAMPLE_RATE, 0 disables tracing), every
+listener task it starts inherits a trace context. Listener runs, command
+processing and the REST calls they await are each written as one span record:
+
+    {"trace": "4211-17", "event": "message", "key": 1234, "span": "SecurityCog.on_message",
+     "kind": "listener", "parent": null, "start": 1760000000.123, "ms": 1.84}
+
+Group the lines by "trace" to rebuild what one event cost. Records are
+buffered and appended on the persistence pool; the file rotates at
+TRACE_MAX_BYTES keeping TRACE_BACKUPS old files.
+"""
+import contextlib
+import contextvars
+import itertools
+import logging
+import os
+import random
+import time
+from pathlib import Path
+
+from utils import persistence
+from utils.codec import json_codec
+
+log = logging.getLogger("CM-V5.4")
+
+SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))
+TRACE_FILE = Path(os.getenv("TRACE_FILE", "data/traces.jsonl"))
+MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(10 * 2**20)))
+BACKUPS = int(os.getenv("TRACE_BACKUPS", "3"))
+
+_trace: contextvars.ContextVar[dict | None] = contextvars.ContextVar("trace", default=None)
+_span: contextvars.ContextVar[str | None] = contextvars.ContextVar("span", default=None)
+_ids = itertools.count(1)
+_buffer: list[dict] = []
+
+def _event_key(args: tuple):
+    """Id of the event's subject (message, member, guild...), so a trace can be matched to it."""
+    return getattr(args[0], "id", None) if args else None
+
+def start_trace(event_name: str, args: tuple) -> contextvars.Token | None:
+    """Sample an event; tasks created until end_trace() belong to it. None when not sampled."""
+    if SAMPLE_RATE <= 0 or random.random() >= SAMPLE_RATE:
+        return None
+    trace = {"trace": f"{os.getpid()}-{next(_ids)}", "event": event_name, "key": _event_key(args)}
+    return _trace.set(trace)
+
+def end_trace(token: contextvars.Token | None):
+    if token is not None:
+        _trace.reset(token)
+
+def active() -> bool:
+    return _trace.get() is not None
+
+@contextlib.contextmanager
+def span(name: str, kind: str):
+    """Record the enclosed block as a span of the current trace (no-op outside a trace)."""
+    trace = _trace.get()
+    if trace is None:
+        yield
+        return
+    parent = _span.get()
+    token = _span.set(name)
+    wall, start = time.time(), time.perf_counter()
+    try:
+        yield
+    finally:
+        _span.reset(token)
+        record(trace, name, kind, parent, wall, time.perf_counter() - start)
+
+def record_rest(method: str, route: str, status, wall: float, seconds: float):
+    """Called from the REST trace hook; the request runs in the awaiting task's context."""
+    trace = _trace.get()
+    if trace is not None:
+        record(trace, f"{method} {route}", "rest", _span.get(), wall, seconds, status=status)
+
+def record(trace: dict, name: str, kind: str, parent: str | None, wall: float, seconds: float, **extra):
+    _buffer.append({
+        **trace, "span": name, "kind": kind, "parent": parent,
+        "start": round(wall, 6), "ms": round(seconds * 1000, 3), **extra
+    })
+    if len(_buffer) == 1:
+        persistence.schedule(str(TRACE_FILE), _flush)
+
+# -----------------------
+# Sink
+# -----------------------
+def _rotate():
+    for i in range(BACKUPS - 1, 0, -1):
+        older = TRACE_FILE.with_name(f"{TRACE_FILE.name}.{i}")
+        if older.exists():
+            older.replace(TRACE_FILE.with_name(f"{TRACE_FILE.name}.{i + 1}"))
+    if BACKUPS > 0:
+        TRACE_FILE.replace(TRACE_FILE.with_name(f"{TRACE_FILE.name}.1"))
+    else:
+        TRACE_FILE.unlink()
+
+def _flush():
+    """Runs on the persistence pool: append buffered spans, rotating the file when it is full."""
+    global _buffer
+    spans, _buffer = _buffer, []
+    if not spans:
+        return
+    try:
+        if TRACE_FILE.exists() and TRACE_FILE.stat().st_size >= MAX_BYTES:
+            _rotate()
+        persistence.append_records(TRACE_FILE, spans, json_codec())
+    except OSError as e:
+        log.warning(f"Dropped {len(spans)} trace spans: {e}")
+
+persistence.on_flush(_flush)
@@ -0,0 +1,100 @@
+"""Opt-in event loop watchdog (LOOP_WATCHDOG=1).
+
+A heartbeat task records how late the loop wakes it up (event_loop_lag_seconds).
+A separate thread notices when the heartbeat stops for longer than the
+threshold, grabs the loop thread's current stack while it is still blocked,
+and counts the stall against the innermost frame from this project
+(event_loop_blocked_total{site="cogs/github_searchs.py:23 in github_request"}).
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import Counter as Tally
+from pathlib import Path
+
+from utils.metrics import Counter, Histogram
+
+log = logging.getLogger("CM-V5.4")
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+STACK_DEPTH = 12          # frames shown in the log
+FULL_STACK_EVERY = 60.0   # seconds between full stack dumps for the same site
+
+LOOP_LAG = Histogram(
+    "event_loop_lag_seconds", "How late the event loop ran the watchdog heartbeat",
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+LOOP_BLOCKED = Counter("event_loop_blocked_total", "Event loop stalls over the threshold per call site", ("site",))
+
+def call_site(stack: traceback.StackSummary) -> str:
+    """Innermost frame from this project (falls back to the innermost frame)."""
+    for frame in reversed(stack):
+        path = Path(frame.filename).resolve()
+        if path.is_relative_to(PROJECT_ROOT) and path != Path(__file__).resolve():
+            return f"{path.relative_to(PROJECT_ROOT).as_posix()}:{frame.lineno} in {frame.name}"
+    frame = stack[-1]
+    return f"{frame.filename}:{frame.lineno} in {frame.name}"
+
+class LoopWatchdog:
+    def __init__(self, threshold: float = 0.25, interval: float = 0.05):
+        self.threshold = threshold
+        self.interval = interval
+        self.sites: Tally[str] = Tally()
+        self._beat = time.monotonic()
+        self._loop_thread: int | None = None
+        self._task: asyncio.Task | None = None
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._last_dump: dict[str, float] = {}
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        log.info(f"Event loop watchdog on (threshold {self.threshold * 1000:.0f} ms)")
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _heartbeat(self):
+        while True:
+            before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            LOOP_LAG.observe(max(0.0, now - before - self.interval))
+            self._beat = now
+
+    def _watch(self):
+        reported = None   # heartbeat value of the stall that was already captured
+        while not self._stop.wait(self.interval):
+            beat = self._beat
+            stalled = time.monotonic() - beat
+            if stalled > self.threshold and reported != beat:
+                reported = beat
+                self._capture(stalled)
+
+    def _capture(self, stalled: float):
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame)
+        site = call_site(stack)
+        self.sites[site] += 1
+        LOOP_BLOCKED.inc(site)
+
+        now = time.monotonic()
+        if now - self._last_dump.get(site, 0.0) >= FULL_STACK_EVERY:
+            self._last_dump[site] = now
+            log.warning(
+                f"Event loop blocked for {stalled * 1000:.0f}+ ms at {site} "
+                f"(seen {self.sites[site]}x)\n" + "".join(traceback.format_list(stack[-STACK_DEPTH:]))
+            )
+        else:
+            log.warning(f"Event loop blocked for {stalled * 1000:.0f}+ ms at {site} (seen {self.sites[site]}x)")
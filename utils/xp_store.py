@@ -0,0 +1,126 @@
+"""Compact in-memory XP table for one guild.
+
+Members are stored column-wise in typed arrays instead of one dict per member:
+
+    user_ids  array("Q")  Discord snowflakes (uint64)
+    xp        array("Q")
+    levels    array("I")
+
+plus an open-addressing hash table (array("i") of slot numbers) mapping a user
+id to its slot. That is roughly 30 bytes per member, against ~290 for the old
+{str user_id: {"xp": ..., "level": ...}} layout. While a guild's rankings are
+in use LevelingCog also keeps a utils.rank_index.RankIndex over its table, which
+adds ~4 bytes per member and most of the cost of an XP update; see
+benchmarks/bench_xp_store.py. Guild settings such as the
+level-up channel stay in the guild config (utils.storage), not in this table.
+
+Members are never removed, matching the levels table in the database.
+"""
+from array import array
+from typing import Iterable, Iterator
+
+_EMPTY = -1
+_GOLDEN = 0x9E3779B97F4A7C15   # Fibonacci hashing; snowflake low bits are mostly zero
+_MASK64 = (1 << 64) - 1
+_MIN_BITS = 4
+
+class GuildLevels:
+    __slots__ = ("user_ids", "xp", "levels", "_table", "_bits")
+
+    def __init__(self, rows: Iterable[tuple[int, int, int]] = ()):
+        """rows: (user_id, xp, level) triples."""
+        self.user_ids = array("Q")
+        self.xp = array("Q")
+        self.levels = array("I")
+        self._bits = _MIN_BITS
+        self._table = array("i", [_EMPTY]) * (1 << self._bits)
+        for user_id, xp, level in rows:
+            self.set(user_id, xp, level)
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def __contains__(self, user_id: int) -> bool:
+        return self.slot(user_id) is not None
+
+    def __iter__(self) -> Iterator[tuple[int, int, int]]:
+        """(user_id, xp, level) of every member, in insertion order."""
+        return zip(self.user_ids, self.xp, self.levels)
+
+    def __sizeof__(self) -> int:
+        # Lets sys.getsizeof / the memory snapshot see the arrays behind the object
+        return object.__sizeof__(self) + sum(
+            a.__sizeof__() for a in (self.user_ids, self.xp, self.levels, self._table)
+        )
+
+    # -------------------
+    # Hash index
+    # -------------------
+    def _probe(self, user_id: int) -> int:
+        """Table position holding user_id, or the empty position where it would go."""
+        table, user_ids = self._table, self.user_ids
+        mask = len(table) - 1
+        pos = ((user_id * _GOLDEN) & _MASK64) >> (64 - self._bits)
+        while True:
+            slot = table[pos]
+            if slot == _EMPTY or user_ids[slot] == user_id:
+                return pos
+            pos = (pos + 1) & mask
+
+    def _grow(self):
+        self._bits += 1
+        self._table = array("i", [_EMPTY]) * (1 << self._bits)
+        for slot, user_id in enumerate(self.user_ids):
+            self._table[self._probe(user_id)] = slot
+
+    def slot(self, user_id: int) -> int | None:
+        slot = self._table[self._probe(user_id)]
+        return None if slot == _EMPTY else slot
+
+    # -------------------
+    # Rows
+    # -------------------
+    def get(self, user_id: int) -> tuple[int, int] | None:
+        """(xp, level) of the member, or None when they are not tracked."""
+        slot = self.slot(user_id)
+        return None if slot is None else (self.xp[slot], self.levels[slot])
+
+    def get_xp(self, user_id: int) -> int | None:
+        slot = self.slot(user_id)
+        return None if slot is None else self.xp[slot]
+
+    def set(self, user_id: int, xp: int, level: int) -> int:
+        """Store a member's values, adding them if needed; returns their slot."""
+        pos = self._probe(user_id)
+        slot = self._table[pos]
+        if slot != _EMPTY:
+            self.xp[slot] = xp
+            self.levels[slot] = level
+            return slot
+        slot = len(self.user_ids)
+        self.user_ids.append(user_id)
+        self.xp.append(xp)
+        self.levels.append(level)
+        self._table[pos] = slot
+        # Keep the table at most half full so probes stay short
+        if 2 * len(self.user_ids) > len(self._table):
+            self._grow()
+        return slot
+
+    def add_xp(self, user_id: int, amount: int) -> int:
+        """Add XP (tracking the member at level 0 if new) and return their slot."""
+        slot = self.slot(user_id)
+        if slot is None:
+            return self.set(user_id, amount, 0)
+        self.xp[slot] += amount
+        return slot
+
+def load_guilds(rows: Iterable[tuple[int, int, int, int]]) -> dict[int, GuildLevels]:
+    """Build {guild_id: GuildLevels} from (guild_id, user_id, xp, level) rows."""
+    guilds: dict[int, GuildLevels] = {}
+    for guild_id, user_id, xp, level in rows:
+        store = guilds.get(guild_id)
+        if store is None:
+            store = guilds[guild_id] = GuildLevels()
+        store.set(user_id, xp, level)
+    return guilds